@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+__description__ = 'Compare peak RSS of extract_img.py loading the Data stream as a string vs an mmap-backed buffer'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Each mode runs in its own process so ru_maxrss is not shared between them. The "read" mode is how
+extract_img.py used to work, data_stream.read() and a copy for every BLIP payload sliced out of it.
+
+Usage:
+$ python benchmarks/bench_memory.py --images 20 --image-size 4000000
+document size 76.9 MB
+mode        peak RSS MB    over baseline MB    seconds
+read              281.1               240.4       1.80
+view              123.8                82.9       0.79
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import synthetic_doc
+
+
+def peak_rss_mb():
+    # ru_maxrss survives exec, so it would include the parent building the document. VmHWM does not.
+    try:
+        with open("/proc/self/status") as fi:
+            for line in fi:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_child(mode, filename):
+    import olefile
+    import extract_img
+
+    class legacy_extract_and_hash_image(extract_img.extract_and_hash_image):
+        def read_bytes(self, num):
+            val = self.stream[self.index:self.index + num]
+            self.index += num
+            return val
+
+    args = extract_img.my_argparser.parse_args([])
+    baseline = peak_rss_mb()
+    start = time.time()
+
+    ole = olefile.OleFileIO(filename)
+    if mode == "read":
+        with ole.openstream(['Data']) as data_stream:
+            data = data_stream.read()
+        processor = legacy_extract_and_hash_image(data, args)
+    else:
+        data = extract_img.read_stream_buffer(ole, ['Data'])
+        processor = extract_img.extract_and_hash_image(data, args)
+    ole.close()
+    processor.Analyze()
+
+    print("{} {} {}".format(peak_rss_mb(), baseline, time.time() - start))
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--images", type=int, help="Number of images in the document", default=20)
+    my_argparser.add_argument("--image-size", type=int, help="Size in bytes of each image", default=8 * 1024 * 1024)
+    my_argparser.add_argument("--child", type=str, help=argparse.SUPPRESS)
+    my_argparser.add_argument("--file", type=str, help=argparse.SUPPRESS)
+
+    args = my_argparser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.file)
+        sys.exit(0)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        doc = os.path.join(temp_dir, "memory.doc")
+        synthetic_doc.write_document(doc, [("png", synthetic_doc.fake_payload("png", args.image_size), u"")
+                                           for _ in range(args.images)])
+        print("document size {:.1f} MB".format(os.path.getsize(doc) / 1048576.0))
+        print("{:<8}{:>15}{:>20}{:>11}".format("mode", "peak RSS MB", "over baseline MB", "seconds"))
+        for mode in ["read", "view"]:
+            output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", mode,
+                                              "--file", doc])
+            peak, baseline, seconds = [float(val) for val in output.split()[-3:]]
+            print("{:<8}{:>15.1f}{:>20.1f}{:>11.2f}".format(mode, peak, peak - baseline, seconds))
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+__description__ = 'Query time of the perceptual_hash.py near-duplicate index against a linear scan'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Fills an index in a temp dir with --rows random hashes, then looks up --queries hashes made by flipping
+up to --radius bits of stored ones. The linear scan is a numpy XOR and popcount over every stored hash,
+about the best a scan can do. Both have to find the same matches.
+
+Usage:
+$ python benchmarks/bench_near_dup.py --rows 1000000
+rows      radius   fill s   index ms/query   scan ms/query   matches
+1000000        6    43.40            8.338          74.259       200
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import perceptual_hash
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def scan(hashes, value, radius):
+    distances = POPCOUNT[(hashes ^ np.uint64(value)).view(np.uint8)].reshape(len(hashes), 8).sum(axis=1)
+    return set(int(h) for h in hashes[distances <= radius])
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--rows", type=int, help="Hashes in the index", default=200000)
+    my_argparser.add_argument("--queries", type=int, help="Lookups to time", default=200)
+    my_argparser.add_argument("--radius", type=int, help="Query radius in bits", default=perceptual_hash.DEFAULT_RADIUS)
+    my_argparser.add_argument("--seed", type=int, help="Random seed", default=1)
+
+    args = my_argparser.parse_args()
+
+    rng = random.Random(args.seed)
+    values = [rng.getrandbits(64) for _ in range(args.rows)]
+    hashes = np.array(values, dtype=np.uint64)
+    queries = [flip_bits(rng.choice(values), rng.randint(0, args.radius), rng) for _ in range(args.queries)]
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        index = perceptual_hash.near_dup_index(os.path.join(temp_dir, "near_dup.sqlite"))
+        start = time.time()
+        with index.db:
+            index.db.executemany("INSERT OR REPLACE INTO near_dups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 ([str(i), "", "{:016x}".format(value)] + perceptual_hash.chunks(value) + [u"", None, 0]
+                                  for i, value in enumerate(values)))
+        fill = time.time() - start
+
+        start = time.time()
+        found = [set(other for _, _, other in index.query(value, "", args.radius)) for value in queries]
+        index_ms = (time.time() - start) * 1000 / len(queries)
+
+        start = time.time()
+        expected = [scan(hashes, value, args.radius) for value in queries]
+        scan_ms = (time.time() - start) * 1000 / len(queries)
+        index.close()
+
+        if found != expected:
+            raise AssertionError("index and linear scan found different matches")
+        print("{:<10}{:>6}{:>9}{:>17}{:>16}{:>10}".format("rows", "radius", "fill s", "index ms/query", "scan ms/query",
+                                                         "matches"))
+        print("{:<10}{:>6}{:>9.2f}{:>17.3f}{:>16.3f}{:>10}".format(args.rows, args.radius, fill, index_ms, scan_ms,
+                                                                  sum(len(matches) for matches in found)))
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+__description__ = 'OCR accuracy and time per image of --ocr-resize auto against fixed scales'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Renders images with known text, from a small icon to a page scanned at 300 dpi, each with the size
+it would be shown at in the document, and runs extract_text on them with every --resize. Accuracy is
+difflib's ratio between the words tesseract found and the words rendered, seconds are the whole of
+extract_text, decode to OCR. Needs tesseract, and a TrueType font for the text, DejaVu Sans by default.
+
+One line per image and --resize value, with the scale used, then the mean seconds and accuracy of
+each --resize value over all the images.
+
+Usage:
+$ python benchmarks/bench_ocr_scale.py --resize 0 2 auto
+$ python benchmarks/bench_ocr_scale.py --images screenshot scan --preprocess otsu --backend tesserocr
+$ python benchmarks/bench_ocr_scale.py --images scan --resize 2 --tiles 4
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import difflib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image, ImageDraw, ImageFont
+
+import extract_img
+
+WORDS = ["enable", "content", "editing", "document", "protected", "microsoft", "office", "click", "above",
+         "view", "this", "please", "security", "warning", "macros", "have", "been", "disabled", "to"]
+
+# name, pixel size, text height in pixels, inches it is shown at across
+IMAGES = [("icon", (240, 64), 11, 2.0),
+          ("banner", (900, 220), 22, 6.0),
+          ("screenshot", (1920, 1080), 14, 6.5),
+          ("scan", (2480, 1754), 46, 8.27)]
+
+
+def render(size, text_height, font_path, seed=0):
+    '''
+    Returns the PNG and the words in it
+    '''
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, (250, 250, 250))
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.truetype(font_path, text_height)
+    except IOError:
+        font = ImageFont.load_default()
+    words = []
+    y = text_height // 2
+    while y + text_height * 1.5 < size[1]:
+        x = text_height // 2
+        while True:
+            word = rng.choice(WORDS)
+            width = draw.textsize(word + " ", font=font)[0]
+            if x + width > size[0] - text_height // 2:
+                break
+            draw.text((x, y), word, fill=(30, 30, 30), font=font)
+            words.append(word)
+            x += width
+        y += int(text_height * 1.6)
+    data = io.BytesIO()
+    img.save(data, "PNG")
+    return data.getvalue(), words
+
+
+def accuracy(text, words):
+    found = text.lower().split()
+    return difflib.SequenceMatcher(None, found, words).ratio()
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--resize", type=extract_img.ocr_resize_arg, nargs="+", help="--ocr-resize values to compare",
+                              default=[0, 2, "auto"])
+    my_argparser.add_argument("--images", type=str, nargs="+", help="Images to render", default=[name for name, _, _, _ in IMAGES],
+                              choices=[name for name, _, _, _ in IMAGES])
+    my_argparser.add_argument("--preprocess", type=str, help="Preprocessing engine", default="sample",
+                              choices=["sample", "otsu", "kmeans"])
+    my_argparser.add_argument("--backend", type=str, help="OCR backend", default="auto")
+    my_argparser.add_argument("--tiles", type=int, help="OCR images of --tile-size Mpixels or more in this many strips", default=0)
+    my_argparser.add_argument("--tile-size", type=int, help="Smallest image in Mpixels to OCR in strips", default=4)
+    my_argparser.add_argument("--font", type=str, help="TrueType font to render the text with",
+                              default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+    args = my_argparser.parse_args()
+
+    if not extract_img.load_ocr():
+        sys.exit("OCR requires pytesseract and Pillow")
+
+    print("{:<12}{:>11}{:>15}{:>9}{:>8}{:>10}{:>11}".format("image", "pixels", "shown at in", "resize", "scale",
+                                                            "seconds", "accuracy"))
+    totals = dict((resize, [0.0, 0.0]) for resize in args.resize)
+    for name, size, text_height, inches in IMAGES:
+        if name not in args.images:
+            continue
+        data, words = render(size, text_height, args.font)
+        display_size = (inches, inches * size[1] / size[0])
+        for resize in args.resize:
+            if resize == "auto":
+                scale = extract_img.ocr_scale(size[0], size[1], display_size)
+            else:
+                scale = resize or 1
+            start = time.time()
+            text, _ = extract_img.extract_text(data, resize, False, args.preprocess, args.backend, None, display_size,
+                                               args.tiles, args.tile_size * 1024 * 1024)
+            seconds = time.time() - start
+            score = accuracy(text, words)
+            totals[resize][0] += seconds
+            totals[resize][1] += score
+            print("{:<12}{:>11}{:>15}{:>9}{:>8.2f}{:>10.3f}{:>11.3f}".format(
+                name, "{}x{}".format(*size), "{:.2f}x{:.2f}".format(*display_size), resize, scale, seconds, score))
+    count = len(args.images)
+    for resize in args.resize:
+        print("{:<12}{:>11}{:>15}{:>9}{:>8}{:>10.3f}{:>11.3f}".format("mean", "", "", resize, "", totals[resize][0] / count,
+                                                                     totals[resize][1] / count))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+__description__ = 'Pixels per second of the OCR preprocessing engines'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Renders screenshot like images, a light background with dark text and some noise, and runs each
+engine on them. kmeans is the original img_convert_n_colors from extract_img.py.
+
+Usage:
+$ python benchmarks/bench_preprocess.py --sizes 1920x1080 2000x4000
+size          engine      seconds     Mpixels/s   freq_color
+1920x1080     kmeans        5.914         0.351   efeeef
+1920x1080     sample        0.294         7.042   eeefee
+1920x1080     otsu          0.192        10.805   efeeef
+2000x4000     kmeans       24.495         0.327   efeeef
+2000x4000     sample        0.887         9.014   eeeeee
+2000x4000     otsu          0.632        12.668   efeeef
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+import img_preprocess
+
+
+def render_screenshot(width, height, seed=0):
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (239, 239, 239))
+    draw = ImageDraw.Draw(img)
+    for y in range(10, height - 20, 24):
+        x = 10
+        while x < width - 100:
+            word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+            draw.text((x, y), word, fill=(20, 20, 20))
+            x += 7 * len(word) + 8
+    ar = np.asarray(img).astype(np.int16)
+    noise = np.random.RandomState(seed).randint(-6, 7, ar.shape)
+    return Image.fromarray((ar + noise).clip(0, 255).astype(np.uint8))
+
+
+def run_engine(engine, img, repeat):
+    import extract_img
+    if engine == "kmeans":
+        func = lambda: extract_img.img_convert_n_colors(2, img)
+    else:
+        func = lambda: img_preprocess.binarize(img, engine, 2)
+
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        _, freq_color = func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, freq_color[1]
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--sizes", type=str, nargs="+", help="Image sizes to test, WIDTHxHEIGHT",
+                              default=["800x600", "1920x1080", "2000x4000"])
+    my_argparser.add_argument("--engines", type=str, nargs="+", help="Engines to test",
+                              default=["kmeans", "sample", "otsu"])
+    my_argparser.add_argument("--repeat", type=int, help="Best of X runs", default=3)
+
+    args = my_argparser.parse_args()
+
+    print("{:<14}{:<10}{:>9}{:>14}   {}".format("size", "engine", "seconds", "Mpixels/s", "freq_color"))
+    for size in args.sizes:
+        width, height = [int(val) for val in size.split("x")]
+        img = render_screenshot(width, height)
+        for engine in args.engines:
+            seconds, colour = run_engine(engine, img, args.repeat)
+            print("{:<14}{:<10}{:>9.3f}{:>14.3f}   {}".format(size, engine, seconds,
+                                                              width * height / seconds / 1e6, colour))
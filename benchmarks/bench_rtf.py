@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+__description__ = 'Throughput of rtf_text.py on RTF from a few KB to many MB'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Builds RTF of each --sizes MB, either paragraphs of text with formatting on every few words, or a
+little text between large \\pict groups, and times parse_rtf on it. Seconds per MB should stay the
+same as the size goes up.
+
+Usage:
+$ python benchmarks/bench_rtf.py --sizes 0.1 1 10
+kind        MB   seconds    MB/s   text chars
+text       0.1     0.046    2.19        64074
+text       1.0     0.463    2.16       640749
+text      10.0     5.037    1.99      6407939
+picture    0.1     0.003   23.08           54
+picture    0.9     0.012   78.86          824
+picture   10.0     0.115   86.50         8744
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import rtf_text
+
+HEADER = b"{\\rtf1\\ansi\\ansicpg1252\\deff0{\\fonttbl{\\f0\\fnil MS Sans Serif;}{\\f1\\fswiss Arial;}}\r\n"
+PARAGRAPH = b"\\pard\\f0\\fs16 Enable content to view this \\b protected\\b0  document, caf\\'e9 \\u8217?\\par\r\n"
+PICTURE = b"{\\pict\\pngblip " + b"89504e470d0a1a0a0000000d49484452" * 2048 + b"}\r\n" + PARAGRAPH
+
+
+def build(kind, size):
+    chunk = PARAGRAPH if kind == "text" else PICTURE
+    return HEADER + chunk * max(1, int(size * 1024 * 1024) // len(chunk)) + b"}"
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--sizes", type=float, nargs="+", help="Sizes of RTF to parse in MB", default=[0.1, 1, 10])
+    my_argparser.add_argument("--kinds", type=str, nargs="+", help="Kinds of RTF", default=["text", "picture"],
+                              choices=["text", "picture"])
+
+    args = my_argparser.parse_args()
+
+    print("{:<8}{:>6}{:>10}{:>8}{:>13}".format("kind", "MB", "seconds", "MB/s", "text chars"))
+    for kind in args.kinds:
+        for size in args.sizes:
+            data = build(kind, size)
+            start = time.time()
+            result = rtf_text.parse_rtf(data)
+            seconds = time.time() - start
+            mb = len(data) / 1048576.0
+            print("{:<8}{:>6.1f}{:>10.3f}{:>8.2f}{:>13}".format(kind, mb, seconds, mb / max(seconds, 1e-9),
+                                                               len(result["text"])))
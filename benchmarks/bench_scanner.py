@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+__description__ = 'Per document time of doc_scanner.py against extract_img.py and inkedit_parser.py run one after the other'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Scans each document --repeat times in this process, first the way two tools do it, extract_img's
+analyze_document then inkedit_parser's iter_forms each opening the document, then with
+doc_scanner.scan_document opening it once. No OCR. Total is the mean milliseconds per scan, overhead
+is the part of it spent opening the document and walking its directory, the rest (reading the Data
+stream, hashing images, parsing controls) is the same work either way. Documents without a Data
+stream are skipped, analyze_document fails on them.
+
+Usage:
+$ python benchmarks/bench_scanner.py /tmp/mixed.doc /tmp/emf.doc --repeat 100
+document            separate ms  scanner ms  separate overhead  scanner overhead  ratio
+mixed.doc                13.656      14.673              1.657             1.025   0.62
+emf.doc                 154.970     142.367              2.099             1.188   0.57
+
+3000 forms, most of the overhead is loading the directory:
+$ python benchmarks/bench_scanner.py /tmp/manyforms.doc --repeat 3
+manyforms.doc          3626.889    2732.617           1989.933          1069.691   0.54
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import olefile
+
+import doc_scanner
+import extract_img
+import inkedit_parser
+import pipeline_stats
+
+
+OVERHEAD_STAGES = ["open", "directory"] # paid by each tool, reading the Data stream is done once either way
+
+
+def separate(filename, args, stats):
+    extract_img.analyze_document(filename, args, stats)
+    with stats.stage("open"):
+        ole = olefile.OleFileIO(filename)
+    with stats.stage("directory"):
+        index = inkedit_parser.storage_index(ole) # what iter_forms does on its own
+    for path, controls in inkedit_parser.iter_forms(ole, index):
+        [doc_scanner.control_to_dict(control) for control in controls]
+    ole.close()
+
+
+def timed(scan, filename, args, repeat):
+    '''
+    Returns the mean total and overhead milliseconds of a scan
+    '''
+    stats = pipeline_stats.pipeline_stats()
+    start = time.time()
+    for _ in range(repeat):
+        scan(filename, args, stats)
+    seconds = time.time() - start
+    stages = stats.summary()["stages"]
+    overhead = sum(stages[name]["seconds"] for name in OVERHEAD_STAGES if name in stages)
+    return seconds / repeat * 1000, overhead / repeat * 1000
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("documents", type=str, nargs="+", help="Documents to scan")
+    my_argparser.add_argument("--repeat", type=int, help="Times to scan each document", default=50)
+
+    args = my_argparser.parse_args()
+
+    extract_args = extract_img.default_options()
+    extract_args.uid_cache = 0 # every repeat does the work again
+
+    print("{:<18}{:>13}{:>12}{:>19}{:>18}{:>7}".format("document", "separate ms", "scanner ms", "separate overhead",
+                                                        "scanner overhead", "ratio"))
+    for filename in args.documents:
+        ole = olefile.OleFileIO(filename)
+        has_data = ole.exists("Data")
+        ole.close()
+        if not has_data:
+            continue
+        before, before_overhead = timed(separate, filename, extract_args, args.repeat)
+        after, after_overhead = timed(doc_scanner.scan_document, filename, extract_args, args.repeat)
+        print("{:<18}{:>13.3f}{:>12.3f}{:>19.3f}{:>18.3f}{:>7.2f}".format(
+            os.path.basename(filename)[:17], before, after, before_overhead, after_overhead,
+            after_overhead / max(before_overhead, 1e-9)))
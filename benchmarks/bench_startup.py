@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+__description__ = 'Cold start time of extract_img.py without OCR, against python and olefile on their own'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Every command runs in a fresh interpreter, best and median of --repeat runs. A run without --ocr
+should cost about what importing olefile does, the heavy column lists any of the OCR, imaging or
+LibreOffice modules that got imported anyway.
+
+Usage:
+$ python benchmarks/bench_startup.py
+command                     best ms   median ms   heavy
+python                         12.9        14.9
+import olefile                 27.3        28.3
+import extract_img             45.5        51.2
+extract_img -f doc             61.5        68.9
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import synthetic_doc
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY_MODULES = ["numpy", "scipy", "PIL", "pytesseract", "tesserocr", "img_preprocess", "ocr_engine",
+                 "metafile_converter", "ocr_cache", "multiprocessing", "uno"]
+
+REPORT_HEAVY = ("import sys; sys.stderr.write(' '.join(m for m in {!r} if m in sys.modules))").format(HEAVY_MODULES)
+
+
+def commands(doc):
+    return [("python", [sys.executable, "-c", "pass"]),
+            ("import olefile", [sys.executable, "-c", "import olefile"]),
+            ("import extract_img", [sys.executable, "-c", "import extract_img; " + REPORT_HEAVY]),
+            ("extract_img -f doc", [sys.executable, "-c", "import sys; sys.argv = ['extract_img.py', '-f', {!r}]; "
+                                    "import runpy; runpy.run_path('extract_img.py', run_name='__main__'); "
+                                    .format(doc) + REPORT_HEAVY])]
+
+
+def time_command(cmd, repeat):
+    times = []
+    heavy = ""
+    with open(os.devnull, "w") as devnull:
+        for _ in range(repeat):
+            start = time.time()
+            proc = subprocess.Popen(cmd, cwd=REPO, stdout=devnull, stderr=subprocess.PIPE)
+            heavy = proc.communicate()[1].decode("utf-8", "replace").strip()
+            times.append(time.time() - start)
+    times.sort()
+    return times[0] * 1000, times[len(times) // 2] * 1000, heavy
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--repeat", type=int, help="Runs per command", default=10)
+
+    args = my_argparser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        doc = os.path.join(temp_dir, "startup.doc")
+        synthetic_doc.write_document(doc, [("png", synthetic_doc.fake_payload("png", 1000), u"") for _ in range(3)])
+        # compile once so the .pyc files are there, like an installed copy
+        env = dict(os.environ)
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        subprocess.call([sys.executable, "-c", "import extract_img"], cwd=REPO, env=env)
+
+        print("{:<26}{:>9}{:>12}   {}".format("command", "best ms", "median ms", "heavy"))
+        for name, cmd in commands(doc):
+            best, median, heavy = time_command(cmd, args.repeat)
+            print("{:<26}{:>9.1f}{:>12.1f}   {}".format(name, best, median, heavy))
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+__description__ = 'Parse throughput, preprocessing time and peak memory of extract_img.py and inkedit_parser.py'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Builds synthetic documents with synthetic_doc.py in a temp dir and runs each stage in its own process,
+so the peak RSS of one stage doesn't hide the next. Nothing is downloaded and no Office, LibreOffice
+or tesseract is needed, OCR is left off and preprocessing runs on rendered screenshots.
+
+    extract_img  - analyze_document on a document with the --mix of images, MB/s of the Data stream
+                   and images/s
+    inkedit      - every form storage parsed with inkedit_parser.py, controls/s
+    preprocess   - img_preprocess.binarize on --screenshots rendered images, seconds per image
+
+Usage:
+$ python benchmarks/bench_suite.py
+stage           seconds        MB/s      items/s   peak RSS MB   over baseline MB
+extract_img       0.870      73.726       22.998         111.6               64.7
+inkedit           0.033           -     6113.968          11.3                0.6
+preprocess        1.115           -        3.589         143.9               40.1
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import synthetic_doc
+from bench_memory import peak_rss_mb
+
+STAGES = ["extract_img", "inkedit", "preprocess"]
+
+
+def reset_peak_rss():
+    '''
+    Sets VmHWM back to the current RSS, so setting up a stage doesn't count towards its peak
+    '''
+    try:
+        with open("/proc/self/clear_refs", "w") as fo:
+            fo.write("5")
+    except IOError:
+        pass
+    return peak_rss_mb()
+
+
+def run_extract_img(filename, args):
+    import olefile
+    import extract_img
+
+    with olefile.OleFileIO(filename) as ole:
+        data_size = ole.get_size("Data")
+    baseline = reset_peak_rss()
+    start = time.time()
+    result = extract_img.analyze_document(filename, extract_img.my_argparser.parse_args([]))
+    return {"seconds": time.time() - start, "mb": data_size / 1048576.0, "items": len(result), "baseline": baseline}
+
+
+def run_inkedit(filename, args):
+    import olefile
+    import inkedit_parser
+
+    baseline = reset_peak_rss()
+    start = time.time()
+    count = 0
+    ole = olefile.OleFileIO(filename)
+    for _ in inkedit_parser.iter_controls(ole):
+        count += 1
+    ole.close()
+    return {"seconds": time.time() - start, "mb": None, "items": count, "baseline": baseline}
+
+
+def run_preprocess(filename, args):
+    import img_preprocess
+    from bench_preprocess import render_screenshot
+
+    width, height = [int(val) for val in args.screenshot_size.split("x")]
+    images = [render_screenshot(width, height, seed) for seed in range(args.screenshots)]
+    baseline = reset_peak_rss()
+    start = time.time()
+    for img in images:
+        img_preprocess.binarize(img, args.preprocess, 2)
+    return {"seconds": time.time() - start, "mb": None, "items": len(images), "baseline": baseline}
+
+
+RUNNERS = {"extract_img": run_extract_img, "inkedit": run_inkedit, "preprocess": run_preprocess}
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--stages", type=str, nargs="+", help="Stages to run", default=STAGES, choices=STAGES)
+    my_argparser.add_argument("--mix", type=str, help="Images in the extract_img document, TYPE:COUNT,...",
+                              default="png:8,jpeg:4,dib:2,tiff:2,emf:2,wmf:2")
+    my_argparser.add_argument("--image-size", type=int, help="Size in bytes of each image", default=4 * 1024 * 1024)
+    my_argparser.add_argument("--forms", type=int, help="Number of form storages in the inkedit document", default=20)
+    my_argparser.add_argument("--controls", type=int, help="Number of InkEdit controls in each form", default=10)
+    my_argparser.add_argument("--screenshots", type=int, help="Number of images to preprocess", default=4)
+    my_argparser.add_argument("--screenshot-size", type=str, help="Size of the images to preprocess, WIDTHxHEIGHT",
+                              default="1920x1080")
+    my_argparser.add_argument("--preprocess", type=str, help="Preprocessing engine", default="sample",
+                              choices=["sample", "otsu"])
+    my_argparser.add_argument("--child", type=str, help=argparse.SUPPRESS)
+    my_argparser.add_argument("--file", type=str, help=argparse.SUPPRESS)
+
+    args = my_argparser.parse_args()
+
+    if args.child:
+        result = RUNNERS[args.child](args.file, args)
+        result["peak"] = peak_rss_mb()
+        print(json.dumps(result))
+        sys.exit(0)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        images_doc = os.path.join(temp_dir, "images.doc")
+        synthetic_doc.write_document(images_doc, synthetic_doc.mixed_images(synthetic_doc.parse_mix(args.mix),
+                                                                             args.image_size))
+        forms_doc = os.path.join(temp_dir, "forms.doc")
+        synthetic_doc.write_document(forms_doc, [], [[u"InkEdit{}".format(i + 1) for i in range(args.controls)]
+                                                     for _ in range(args.forms)])
+        docs = {"extract_img": images_doc, "inkedit": forms_doc, "preprocess": ""}
+
+        print("{:<12}{:>11}{:>12}{:>13}{:>14}{:>19}".format("stage", "seconds", "MB/s", "items/s", "peak RSS MB",
+                                                            "over baseline MB"))
+        for stage in args.stages:
+            output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", stage,
+                                              "--file", docs[stage]] + sys.argv[1:])
+            result = json.loads(output.decode("utf-8").splitlines()[-1])
+            seconds = max(result["seconds"], 1e-6)
+            mb_per_second = "{:.3f}".format(result["mb"] / seconds) if result["mb"] is not None else "-"
+            print("{:<12}{:>11.3f}{:>12}{:>13.3f}{:>14.1f}{:>19.1f}".format(stage, seconds, mb_per_second,
+                                                                         result["items"] / seconds, result["peak"],
+                                                                         result["peak"] - result["baseline"]))
+    finally:
+        shutil.rmtree(temp_dir)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+__description__ = 'Throughput, latency and backpressure of extract_daemon.py under concurrent clients'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Starts a daemon on a temp socket, or uses the one given with --socket, builds a synthetic document with
+synthetic_doc.py and has --clients threads each send it --requests times. Busy answers are counted, not
+retried, so a small --queue shows the backpressure instead of the memory growing. Peak RSS is the
+daemon's VmHWM and is only known for a daemon this script started.
+
+Usage:
+$ python benchmarks/load_test.py --clients 8 --requests 10 --workers 2 --queue 4
+requests   ok   busy   errors   req/s   p50 ms   p95 ms   p99 ms   daemon peak RSS MB
+      80   51     29        0   40.12    136.8    163.9    186.2                 21.1
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import synthetic_doc
+import daemon_client
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def daemon_peak_rss_mb(pid):
+    try:
+        with open("/proc/{}/status".format(pid)) as fi:
+            for line in fi:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except IOError:
+        pass
+    return None
+
+
+def wait_for_socket(socket_path, proc, timeout=30):
+    start = time.time()
+    while time.time() - start < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError("daemon exited with {}".format(proc.returncode))
+        try:
+            daemon_client.daemon_stats(socket_path, 1)
+            return
+        except (IOError, OSError):
+            time.sleep(0.05)
+    raise RuntimeError("daemon didn't start in {} seconds".format(timeout))
+
+
+def client(socket_path, doc, data, requests, latencies, outcomes, lock):
+    for _ in range(requests):
+        start = time.time()
+        try:
+            if data is None:
+                response = daemon_client.submit(socket_path, doc)
+            else:
+                response = daemon_client.submit(socket_path, data=data, name=doc)
+            outcome = "ok" if "images" in response else "busy" if response.get("error") == "busy" else "errors"
+        except (IOError, OSError):
+            outcome = "errors"
+        with lock:
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append(time.time() - start)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--socket", type=str, help="Use a running daemon instead of starting one")
+    my_argparser.add_argument("--clients", type=int, help="Concurrent clients", default=8)
+    my_argparser.add_argument("--requests", type=int, help="Requests sent by each client", default=20)
+    my_argparser.add_argument("--workers", type=int, help="Workers of the started daemon", default=2)
+    my_argparser.add_argument("--queue", type=int, help="Queue of the started daemon", default=4)
+    my_argparser.add_argument("--admit-timeout", type=float, help="Admit timeout of the started daemon", default=0)
+    my_argparser.add_argument("--send-bytes", action='store_true', help="Send the document instead of its path", default=False)
+    my_argparser.add_argument("--mix", type=str, help="Images in the document, TYPE:COUNT,...", default="png:6,jpeg:2,emf:1")
+    my_argparser.add_argument("--image-size", type=int, help="Size in bytes of each image", default=256 * 1024)
+
+    args = my_argparser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    proc = None
+    try:
+        doc = os.path.join(temp_dir, "load.doc")
+        synthetic_doc.write_document(doc, synthetic_doc.mixed_images(synthetic_doc.parse_mix(args.mix), args.image_size))
+        data = None
+        if args.send_bytes:
+            with open(doc, "rb") as fi:
+                data = fi.read()
+
+        socket_path = args.socket
+        if socket_path is None:
+            socket_path = os.path.join(temp_dir, "daemon.sock")
+            with open(os.devnull, "w") as devnull:
+                proc = subprocess.Popen([sys.executable, os.path.join(REPO, "extract_daemon.py"), "--socket", socket_path,
+                                         "--workers", str(args.workers), "--queue", str(args.queue),
+                                         "--admit-timeout", str(args.admit_timeout)], cwd=REPO, stderr=devnull)
+            wait_for_socket(socket_path, proc)
+
+        latencies = []
+        outcomes = {"ok": 0, "busy": 0, "errors": 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=client, args=(socket_path, doc, data, args.requests, latencies, outcomes, lock))
+                   for _ in range(args.clients)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        latencies.sort()
+        peak = daemon_peak_rss_mb(proc.pid) if proc is not None else None
+        print("{:>8}{:>5}{:>7}{:>9}{:>8}{:>9}{:>9}{:>9}{:>21}".format("requests", "ok", "busy", "errors", "req/s",
+                                                                     "p50 ms", "p95 ms", "p99 ms", "daemon peak RSS MB"))
+        print("{:>8}{:>5}{:>7}{:>9}{:>8.2f}{:>9.1f}{:>9.1f}{:>9.1f}{:>21}".format(
+            args.clients * args.requests, outcomes["ok"], outcomes["busy"], outcomes["errors"],
+            outcomes["ok"] / max(elapsed, 1e-6), percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+            percentile(latencies, 99) * 1000, "{:.1f}".format(peak) if peak is not None else "-"))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(temp_dir)
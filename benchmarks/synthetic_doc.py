@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+
+__description__ = 'Build synthetic OLE documents for the doctools benchmarks'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Writes a minimal Compound File Binary (version 3, 512 byte sectors) with a WordDocument style
+Data stream made up of PICFAndOfficeArtData structures, each holding one OfficeArtFBSE and BLIP.
+PNG, JPEG, DIB and TIFF payloads are stored as is, EMF and WMF are DEFLATE compressed like Word
+does. Form storages, Macros/UserForm<n>/f and o, can be added with InkEdit controls in them for
+inkedit_parser.py. Only what olefile, extract_img.py and inkedit_parser.py need is written, the
+result will not open in Word.
+
+Usage:
+$ python synthetic_doc.py -o /tmp/synthetic.doc --images 20 --image-size 8388608
+$ python synthetic_doc.py -o /tmp/mixed.doc --mix png:6,jpeg:2,emf:1,wmf:1 --forms 2 --controls 5
+$ python synthetic_doc.py -o /tmp/copies.doc --mix png:3,emf:2 --copies 10
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import hashlib
+import random
+import struct
+import sys
+import os
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import records
+
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+FATSECT = 0xFFFFFFFD
+DIFSECT = 0xFFFFFFFC
+NOSTREAM = 0xFFFFFFFF
+
+SECTOR_SIZE = 512
+MINI_SECTOR_SIZE = 64
+MINI_STREAM_CUTOFF = 4096
+
+
+class ole_writer():
+    '''
+    Collects streams by path, "Macros/UserForm1/f", and writes them out as a CFB file.
+    Storages are created for every parent path.
+    '''
+
+    def __init__(self):
+        self.root = {}
+
+    def add_stream(self, path, data):
+        node = self.root
+        parts = path.split("/")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = bytes(data)
+
+    def write(self, filename):
+        entries = []  # [name, type, data, children, left, right, child, start, size]
+        self._collect(entries, "Root Entry", 5, self.root)
+
+        # Streams under the cutoff go into the mini stream, which is stored in the root entry chain
+        mini_stream = bytearray()
+        mini_fat = []
+        for entry in entries:
+            if entry[1] == 2 and 0 < len(entry[2]) < MINI_STREAM_CUTOFF:
+                count = (len(entry[2]) + MINI_SECTOR_SIZE - 1) // MINI_SECTOR_SIZE
+                entry[7] = len(mini_fat)
+                mini_fat.extend(range(entry[7] + 1, entry[7] + count))
+                mini_fat.append(ENDOFCHAIN)
+                mini_stream += entry[2] + b"\x00" * (count * MINI_SECTOR_SIZE - len(entry[2]))
+        entries[0][2] = bytes(mini_stream)
+
+        sectors = []  # list of (data, entry index or None)
+        fat = []
+
+        def allocate(data):
+            if not data:
+                return ENDOFCHAIN
+            start = len(fat)
+            count = (len(data) + SECTOR_SIZE - 1) // SECTOR_SIZE
+            fat.extend(range(start + 1, start + count))
+            fat.append(ENDOFCHAIN)
+            sectors.append(data + b"\x00" * (count * SECTOR_SIZE - len(data)))
+            return start
+
+        for entry in entries:
+            if entry[1] == 5 or (entry[1] == 2 and len(entry[2]) >= MINI_STREAM_CUTOFF):
+                entry[7] = allocate(entry[2])
+            entry[8] = len(entry[2])
+            if entry[1] == 2 and len(entry[2]) == 0:
+                entry[7] = ENDOFCHAIN
+
+        mini_fat_data = b"".join(struct.pack("<I", val) for val in mini_fat)
+        mini_fat_start = allocate(mini_fat_data)
+        mini_fat_count = (len(mini_fat_data) + SECTOR_SIZE - 1) // SECTOR_SIZE
+
+        dir_data = b"".join(self._pack_entry(entry) for entry in entries)
+        dir_start = allocate(dir_data)
+
+        # FAT and DIFAT sectors describe themselves as well, so grow until they fit
+        fat_count = 1
+        difat_count = 0
+        while (len(fat) + fat_count + difat_count) > fat_count * (SECTOR_SIZE // 4):
+            fat_count += 1
+            difat_count = max(0, fat_count - 109 + 126) // 127
+        fat_start = len(fat)
+        fat.extend([FATSECT] * fat_count)
+        fat.extend([DIFSECT] * difat_count)
+        fat.extend([FREESECT] * (fat_count * (SECTOR_SIZE // 4) - len(fat)))
+        fat_data = b"".join(struct.pack("<I", val) for val in fat)
+
+        fat_sectors = list(range(fat_start, fat_start + fat_count))
+        difat = fat_sectors[:109] + [FREESECT] * (109 - min(fat_count, 109))
+        difat_data = b""
+        difat_start = fat_start + fat_count
+        for i in range(difat_count):
+            chunk = fat_sectors[109 + i * 127:109 + (i + 1) * 127]
+            chunk += [FREESECT] * (127 - len(chunk))
+            chunk.append(difat_start + i + 1 if i + 1 < difat_count else ENDOFCHAIN)
+            difat_data += b"".join(struct.pack("<I", val) for val in chunk)
+
+        header = struct.pack("<8s16sHHHHH6sIIIIIIIII", b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", b"\x00" * 16,
+                             0x3E, 3, 0xFFFE, 9, 6, b"\x00" * 6, 0, fat_count, dir_start, 0,
+                             MINI_STREAM_CUTOFF, mini_fat_start if mini_fat else ENDOFCHAIN, mini_fat_count,
+                             difat_start if difat_count else ENDOFCHAIN, difat_count)
+        header += b"".join(struct.pack("<I", val) for val in difat)
+
+        with open(filename, "wb") as fo:
+            fo.write(header)
+            for data in sectors:
+                fo.write(data)
+            fo.write(fat_data)
+            fo.write(difat_data)
+
+    def _collect(self, entries, name, entry_type, node):
+        index = len(entries)
+        entries.append([name, entry_type, node if entry_type == 2 else b"", None,
+                        NOSTREAM, NOSTREAM, NOSTREAM, ENDOFCHAIN, 0])
+        if entry_type == 2:
+            return index
+
+        kids = []
+        for kid_name in sorted(node, key=lambda n: (len(n), n.upper())):
+            kid = node[kid_name]
+            kids.append(self._collect(entries, kid_name, 1 if isinstance(kid, dict) else 2, kid))
+        entries[index][6] = self._balance(entries, kids)
+        return index
+
+    def _balance(self, entries, kids):
+        # olefile walks siblings recursively, so keep the tree balanced instead of a long chain
+        if not kids:
+            return NOSTREAM
+        middle = len(kids) // 2
+        entries[kids[middle]][4] = self._balance(entries, kids[:middle])
+        entries[kids[middle]][5] = self._balance(entries, kids[middle + 1:])
+        return kids[middle]
+
+    def _pack_entry(self, entry):
+        name = entry[0].encode("utf-16-le")
+        return struct.pack("<64sHBBIII16sIQQIQ", name, len(name) + 2, entry[1], 1, entry[4], entry[5], entry[6],
+                           b"\x00" * 16, 0, 0, 0, entry[7], entry[8])
+
+
+def record_header(rec_ver, rec_instance, rec_type, rec_len):
+    return struct.pack("<HHI", (rec_instance << 4) | rec_ver, rec_type, rec_len)
+
+
+RASTER_TYPES = ["jpeg", "png", "dib", "tiff"]
+METAFILE_TYPES = ["emf", "wmf"]
+
+
+def payload_uid(payload):
+    # Word stores the MD4 of the image, any stable 16 byte digest does here
+    return hashlib.md5(payload).digest()
+
+
+def blip_record(pic_type, payload, uid=None, compress=True):
+    '''
+    Returns an OfficeArtBlip record, raster payloads are stored as is and metafiles behind an
+    OfficeArtMetafileHeader, DEFLATE compressed unless compress is False
+    '''
+    uid = uid or payload_uid(payload)
+    if pic_type in METAFILE_TYPES:
+        rec_type, rec_instance = {"emf": (0xf01a, 0x3d4), "wmf": (0xf01b, 0x216)}[pic_type]
+        data = zlib.compress(payload) if compress else payload
+        header = records.OfficeArtMetafileHeader.struct.pack(len(payload), b"\x00" * 16, b"\x00" * 8, len(data),
+                                                             0x00 if compress else 0xFE, 0xFE)
+        return record_header(0, rec_instance, rec_type, 16 + len(header) + len(data)) + uid + header + data
+
+    rec_type, rec_instance = {"jpeg": (0xf01d, 0x46a), "png": (0xf01e, 0x6e0),
+                              "dib": (0xf01f, 0x7a8), "tiff": (0xf029, 0x6e4)}[pic_type]
+    return record_header(0, rec_instance, rec_type, 17 + len(payload)) + uid + b"\xff" + payload
+
+
+def fbse_record(pic_type, blip, name=u"", uid=None):
+    name_data = (name + u"\x00").encode("utf-16-le") if name else b""
+    bt = {"emf": 2, "wmf": 3, "pict": 4, "jpeg": 5, "png": 6, "dib": 7, "tiff": 17}[pic_type]
+    body = struct.pack("<BB16sHIIIBBBB", bt, bt, uid or random_bytes(16), 0xff, len(blip), 1, 0, 0,
+                       len(name_data), 0, 0)
+    body += name_data + blip
+    return record_header(2, bt, 0xf007, len(body)) + body
+
+
+def picf_and_officeart(fbse):
+    '''
+    Wraps a FBSE in a PICFAndOfficeArtData with an empty OfficeArtSpContainer ahead of it, like Word
+    '''
+    sp_container = record_header(0xf, 0, 0xf004, 0)
+    header = struct.pack("<HHHHH", 0x44, 0x64, 0, 0, 0)  # cbHeader, mfpf
+    header += struct.pack("<IIHI", 0, 0, 0, 0)  # innerHeader
+    header += struct.pack("<hhHH8sBB16sHH", 1440, 1440, 1000, 1000, b"\x00" * 8, 0, 0, b"\x00" * 16, 0, 0)  # picmid
+    header += struct.pack("<H", 0)  # cProps
+    body = header + sp_container + fbse
+    return struct.pack("<I", len(body) + 4) + body
+
+
+_random = random.Random(0)
+
+
+def random_bytes(size):
+    return bytes(bytearray(_random.getrandbits(8) for _ in range(size)))
+
+
+def fake_payload(pic_type, size):
+    '''
+    Payload with the right magic at the front, extract_img.py only hashes and saves it unless OCR is on
+    '''
+    magic = {"jpeg": b"\xff\xd8\xff\xe0", "png": b"\x89PNG\r\n\x1a\n", "dib": b"\x28\x00\x00\x00",
+             "tiff": b"II*\x00", "emf": b"\x01\x00\x00\x00", "wmf": b"\xd7\xcd\xc6\x9a"}[pic_type]
+    block = random_bytes(4096)
+    payload = magic + block * (size // len(block) + 1)
+    return payload[:size]
+
+
+def build_data_stream(images):
+    '''
+    images is a list of (pic_type, payload, name) tuples
+    '''
+    return b"".join(picf_and_officeart(fbse_record(pic_type, blip_record(pic_type, payload), name, payload_uid(payload)))
+                    for pic_type, payload, name in images)
+
+
+def mixed_images(mix, image_size):
+    '''
+    mix is a list of (pic_type, count), returns the images for build_data_stream with the types interleaved
+    '''
+    images = []
+    remaining = [[pic_type, count] for pic_type, count in mix]
+    while any(count for _, count in remaining):
+        for entry in remaining:
+            if entry[1]:
+                entry[1] -= 1
+                images.append((entry[0], fake_payload(entry[0], image_size), u"image{}".format(len(images))))
+    return images
+
+
+def parse_mix(mix):
+    '''
+    "png:6,jpeg:2,emf:1" to [("png", 6), ("jpeg", 2), ("emf", 1)]
+    '''
+    result = []
+    for item in mix.split(","):
+        pic_type, count = item.split(":")
+        if pic_type not in RASTER_TYPES + METAFILE_TYPES:
+            raise ValueError("unknown picture type " + pic_type)
+        result.append((pic_type, int(count)))
+    return result
+
+
+# InkEdit CLSID {E5CA59F5-57C4-4DD8-9BD6-1DEEEDD27AF4}, as stored in the classTable
+INKEDIT_CLSID = b"\xf5\x59\xca\xe5\xc4\x57\xd8\x4d\x9b\xd6\x1d\xee\xed\xd2\x7a\xf4"
+
+
+def inkedit_control(text, factorid=u"DEFAULT"):
+    '''
+    The InkEdit properties as they are stored in the o stream, see records.InkEditProperties
+    '''
+    factorid_data = factorid.encode("utf-16-le")
+    font = b"\x01\x00\x00\x00\x90\x01\xf8\x24\x01\x00" + struct.pack("B", 13) + b"MS Sans Serif"
+    rtf = (u"{\\rtf1\\ansi\\ansicpg1252\\deff0{\\fonttbl{\\f0\\fnil MS Sans Serif;}}\r\n"
+           u"\\pard\\f0\\fs16 " + text + u"\\par\r\n}\r\n").encode("latin-1")
+    fixed = records.InkEditProperties.struct.pack(2, 0, 0, 505, 0, 0, 3900, 1040, 0x80000005, 1, 1, 0, 2, 0, 2000,
+                                                  0, 0, 0, 0, -1, 0, 0, len(factorid_data))
+    return (fixed + factorid_data + struct.pack("<i", 0) + struct.pack("<i", len(font)) + font +
+            struct.pack("<i", len(rtf)) + rtf)
+
+
+def form_control_stream(sizes):
+    '''
+    A [MS-OFORMS] FormControl, the f stream, with one class table entry for InkEdit and a site using it
+    for each of sizes, the size of the control's data in the o stream
+    '''
+    count = len(sizes)
+    data = struct.pack("<BBHI", 0, 4, 4, 0)  # versions, cbForm, empty FormPropMask
+    # FormSiteData, one SiteClassInfo with only the CLSID set
+    data += struct.pack("<HHHI", 1, 0, 4 + len(INKEDIT_CLSID), 1) + INKEDIT_CLSID
+
+    depths = struct.pack("<BB", 0, 1) * count  # FormObjectDepthTypeCount, one site each
+    depths += b"\x00" * (-len(depths) % 4)
+    sites = b""
+    for i in range(count):
+        name = "InkEdit{}".format(i + 1).encode("ascii")
+        name += b"\x00" * (-len(name) % 4)
+        # SitePropMask fName | fID | fObjectStreamSize | fClsidCacheIndex, 0x8000 is the first class table entry
+        body = struct.pack("<IIIIH2x", 0x1 | 0x4 | 0x20 | 0x80, len(name) | 0x80000000, i + 1, sizes[i], 0x8000) + name
+        sites += struct.pack("<HH", 0, len(body)) + body
+    return data + struct.pack("<II", count, len(depths) + len(sites)) + depths + sites
+
+
+def write_document(filename, images, forms=None):
+    '''
+    forms is a list of forms, each a list of the text of its InkEdit controls
+    '''
+    writer = ole_writer()
+    writer.add_stream("WordDocument", b"\x00" * MINI_STREAM_CUTOFF)
+    writer.add_stream("Data", build_data_stream(images))
+    for i, texts in enumerate(forms or []):
+        controls = [inkedit_control(text) for text in texts]
+        writer.add_stream("Macros/UserForm{}/f".format(i + 1), form_control_stream([len(data) for data in controls]))
+        writer.add_stream("Macros/UserForm{}/o".format(i + 1), b"".join(controls))
+    writer.write(filename)
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("-o", "--output", type=str, help="Document to write", required=True)
+    my_argparser.add_argument("--images", type=int, help="Number of images", default=10)
+    my_argparser.add_argument("--image-size", type=int, help="Size in bytes of each image", default=1024 * 1024)
+    my_argparser.add_argument("--pic-type", type=str, help="Type of image to embed", default="png",
+                              choices=RASTER_TYPES + METAFILE_TYPES)
+    my_argparser.add_argument("--mix", type=str, help="Mix of images instead of --images and --pic-type, TYPE:COUNT,...")
+    my_argparser.add_argument("--copies", type=int, help="Times each image is in the document, like a lure on every page", default=1)
+    my_argparser.add_argument("--forms", type=int, help="Number of form storages with InkEdit controls", default=0)
+    my_argparser.add_argument("--controls", type=int, help="Number of InkEdit controls in each form", default=1)
+
+    args = my_argparser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else [(args.pic_type, args.images)]
+    forms = [[u"InkEdit{}".format(i + 1) for i in range(args.controls)] for _ in range(args.forms)]
+    write_document(args.output, mixed_images(mix, args.image_size) * args.copies, forms)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+__description__ = 'Send documents to extract_daemon.py and print what it found'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+By default only the path is sent and the daemon opens the document itself, --send-bytes sends the
+document over the socket for when the daemon can't see the file.
+
+Usage:
+$ python daemon_client.py --socket /tmp/doctools.sock ../test_docs/image_in_doc.doc
+{"images": [{"file": "/home/user/test_docs/image_in_doc.doc", "pic_type": "jpeg", "sha256": "5737761889ed...", ...}], "stats": {...}}
+
+$ python daemon_client.py --socket /tmp/doctools.sock --send-bytes --ocr ../test_docs/*.doc
+$ python daemon_client.py --socket /tmp/doctools.sock --stats
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import json
+import os
+import socket
+
+
+def _request(socket_path, header, data=None, timeout=None):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        fi = sock.makefile("rb")
+        sock.sendall((json.dumps(header) + "\n").encode("utf-8"))
+        if data is not None:
+            response = json.loads(fi.readline().decode("utf-8"))
+            if not response.get("ready"):
+                return response # busy or refused, the daemon never read the document
+            sock.sendall(data)
+        line = fi.readline()
+        if not line:
+            raise IOError("daemon closed the connection")
+        return json.loads(line.decode("utf-8"))
+    finally:
+        sock.close()
+
+
+def submit(socket_path, path=None, data=None, name="", options=None, timeout=None):
+    '''
+    Send a path, or the document itself as data, returns the daemon's answer as a dict
+    '''
+    if data is None:
+        header = {"path": os.path.abspath(path)}
+    else:
+        header = {"size": len(data), "name": name}
+    if options:
+        header["options"] = options
+    return _request(socket_path, header, data, timeout)
+
+
+def daemon_stats(socket_path, timeout=None):
+    return _request(socket_path, {"command": "stats"}, timeout=timeout)
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("files", type=str, nargs="*", help="Documents to extract images from")
+    my_argparser.add_argument("--socket", type=str, help="Unix socket the daemon listens on", required=True)
+    my_argparser.add_argument("--send-bytes", action='store_true', help="Send the document instead of its path", default=False)
+    my_argparser.add_argument("-o", "--ocr", action='store_true', help="Run OCR on the images", default=False)
+    my_argparser.add_argument("--stats", action='store_true', help="Print the daemon's totals", default=False)
+    my_argparser.add_argument("--timeout", type=float, help="Seconds to wait for each answer", default=None)
+
+    args = my_argparser.parse_args()
+
+    options = {"ocr": True} if args.ocr else None
+    for filename in args.files:
+        if args.send_bytes:
+            with open(filename, "rb") as fi:
+                response = submit(args.socket, data=fi.read(), name=filename, options=options, timeout=args.timeout)
+        else:
+            response = submit(args.socket, filename, options=options, timeout=args.timeout)
+        print(json.dumps(response, sort_keys=True))
+    if args.stats:
+        print(json.dumps(daemon_stats(args.socket, args.timeout), sort_keys=True))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+__description__ = 'Scan a document once for images and form controls, one combined report per document'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Running extract_img.py and then inkedit_parser.py on a document opens it twice: olefile reads the
+header, the FAT, the MiniFAT and the whole directory each time, and the tree is walked for each tool.
+scan_document opens the document once and walks the directory once into inkedit_parser.storage_index.
+The Data stream is found in it and mapped with extract_img.read_stream_buffer, every form storage comes
+from it as well, and the forms are parsed on the same handle before it is closed. The images are then
+extracted from the Data stream as extract_img.py does, with the same options and budgets.
+
+The report has the images as extract_img.py prints them and every form with all of its controls:
+{"file", "images": [...], "forms": [{"form": "Macros/UserForm1/f", "controls": [...]}], "truncated"}
+A form that can't be parsed is {"form", "error"} instead, the rest of the report is still there.
+Control bytes are decoded as cp1252, the font data, the mouse icon and the copy of the RTF in raw_data are left out.
+
+Options after -- are extract_img.py options, like extract_daemon.py.
+
+Usage:
+$ python doc_scanner.py ../doc_inkedit/ink_default.doc
+{"file": "../doc_inkedit/ink_default.doc", "forms": [{"controls": [{"name": "InkEdit1", "text": "InkEdit1", ...}], "form": "Macros/UserForm1/f"}], "images": [], "truncated": null}
+
+$ python doc_scanner.py ../test_docs '../more_docs/*.doc' -j 8 --jsonl reports.jsonl -- -o --ocr-cache ~/.cache/doctools_ocr.sqlite
+
+History:
+  2026/10/18: start
+  2026/10/18: A form that fails to parse is reported with its error instead of failing the whole document
+"""
+
+import argparse
+import json
+import signal
+import sys
+import time
+
+import olefile
+
+import extract_img
+import inkedit_parser
+import pipeline_stats
+
+# binary properties of a control that say nothing read as text, the RTF is in the report once already
+SKIPPED_RAW_FIELDS = ["fontdata", "font_data", "mouseIcon", "rtf_data"]
+
+
+def json_value(value):
+    '''
+    Control properties hold the bytes read from the stream and dicts keyed by numbers
+    '''
+    if isinstance(value, bytes):
+        return value.decode("cp1252", "replace")
+    if isinstance(value, dict):
+        return dict((key if isinstance(key, (bytes, type(u""))) else str(key), json_value(item))
+                    for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [json_value(item) for item in value]
+    return value
+
+
+def control_to_dict(control):
+    values = control.as_dict()
+    if "raw_data" in values:
+        values["raw_data"] = dict((name, value) for name, value in values["raw_data"].items()
+                                  if name not in SKIPPED_RAW_FIELDS)
+    return json_value(values)
+
+
+def scan_document(filename, args, stats=None, name=None, seen=None):
+    '''
+    args are the extract_img.py options. Pass a pipeline_stats to get the stage timings and counters
+    for the document added to it, name is used in the report and for saved images, by default
+    extract_img.document_name.
+    seen is the extract_img.seen_blips of a batch run, see analyze_document.
+    Returns the report as a dict ready for JSON.
+    '''
+    if stats is None:
+        stats = pipeline_stats.pipeline_stats()
+    name = extract_img.document_name(filename, args, name)
+    start = time.time()
+    budget = extract_img.document_budget(args)
+    forms = []
+    with stats.stage("open"):
+        ole = olefile.OleFileIO(filename)
+    try:
+        with stats.stage("directory"):
+            index = inkedit_parser.storage_index(ole)
+        data_entry = index[()].get("data")
+        data = b""
+        if data_entry is not None:
+            with stats.stage("read_stream"):
+                data = extract_img.read_stream_buffer(ole, ["Data"], data_entry)
+        # the form streams are read through the handle, so before it is closed
+        with stats.stage("forms"):
+            for path, controls in inkedit_parser.iter_forms(ole, index):
+                try:
+                    forms.append({"form": "/".join(path), "controls": [control_to_dict(control) for control in controls]})
+                except Exception as e:
+                    # the other forms and the images are still reported
+                    stats.count("form_errors")
+                    forms.append({"form": "/".join(path), "error": "{}: {}".format(type(e).__name__, e)})
+    finally:
+        ole.close()
+    stats.count("documents")
+    stats.count("forms", len(forms))
+    stats.count("data_stream_bytes", len(data))
+
+    try:
+        if data:
+            images = extract_img.extract_and_hash_image(data, args, stats, name, budget, seen).Analyze()
+        else:
+            images = extract_img.document_images()
+    finally:
+        stats.wall_seconds += time.time() - start
+    return {"file": name, "images": [extract_img.result_to_dict(name, result) for result in images],
+            "forms": forms, "truncated": images.truncated}
+
+
+def _scan_init(args):
+    global scan_args, scan_seen
+    scan_args = args
+    scan_seen = extract_img.seen_blips(args.uid_cache) if args.uid_cache > 0 else None
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # let the parent handle ctrl-c and terminate the pool
+    signal.signal(signal.SIGALRM, extract_img._raise_timeout)
+
+
+def _scan_worker(filename):
+    '''
+    Runs in the pool, returns the report line and with --stats the document's summary, see
+    extract_img._batch_worker
+    '''
+    stats = pipeline_stats.pipeline_stats()
+    signal.alarm(scan_args.timeout)
+    try:
+        report = scan_document(filename, scan_args, stats, seen=scan_seen)
+    except Exception as e:
+        stats.count("errors")
+        report = {"file": filename, "error": "{}: {}".format(type(e).__name__, e)}
+    finally:
+        signal.alarm(0)
+
+    summary = None
+    if scan_args.stats:
+        summary = report["stats"] = stats.summary()
+    return json.dumps(report, sort_keys=True), summary
+
+
+def run_scan(files, args):
+    '''
+    Writes a report line per document, with --jobs 1 in this process, otherwise on a pool like extract_img.run_batch
+    '''
+    global scan_args, scan_seen
+    fo = open(args.jsonl, "w") if args.jsonl else sys.stdout
+    pool = None
+    if args.jobs == 1:
+        scan_args = args
+        scan_seen = extract_img.seen_blips(args.uid_cache) if args.uid_cache > 0 else None
+        signal.signal(signal.SIGALRM, extract_img._raise_timeout)
+        reports = (_scan_worker(filename) for filename in files)
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(args.jobs or None, _scan_init, (args,), maxtasksperchild=args.max_tasks_per_child or None)
+        reports = pool.imap_unordered(_scan_worker, files, 1)
+    totals = pipeline_stats.pipeline_stats()
+    try:
+        for line, summary in reports:
+            fo.write(line + "\n")
+            fo.flush()
+            if summary:
+                totals.merge(summary)
+        if pool:
+            pool.close()
+        if args.stats:
+            sys.stderr.write(json.dumps({"batch_stats": totals.summary()}, sort_keys=True) + "\n")
+    except KeyboardInterrupt:
+        if pool:
+            pool.terminate()
+        raise
+    finally:
+        if pool:
+            pool.join()
+        if fo is not sys.stdout:
+            fo.close()
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser(epilog="Options after -- are passed to extract_img.py")
+    my_argparser.add_argument("paths", type=str, nargs="*", help="Documents, directories (walked recursively) or globs")
+    my_argparser.add_argument("--file-list", type=str, help="File with one document per line, - for stdin")
+    my_argparser.add_argument("-j", "--jobs", type=int, help="Number of worker processes, 0 means one per core, 1 scans in this process", default=1)
+    my_argparser.add_argument("--jsonl", type=str, help="Write the reports to this file instead of stdout", default="")
+    my_argparser.add_argument("--max-tasks-per-child", type=int, help="Restart workers after this many documents, 0 means never", default=0)
+    my_argparser.add_argument("--stats", action='store_true', help="Add time spent per stage to each report, and print the totals to stderr", default=False)
+
+    argv = sys.argv[1:]
+    extract_argv = []
+    if "--" in argv:
+        extract_argv = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    args = my_argparser.parse_args(argv)
+    # the batch options of extract_img.py come from here, the rest from after --
+    extract_args = extract_img.my_argparser.parse_args(extract_argv)
+    for option in ["jobs", "jsonl", "max_tasks_per_child", "stats"]:
+        setattr(extract_args, option, getattr(args, option))
+
+    if extract_args.ocr and not extract_img.load_ocr():
+        print("OCR requires pytesseract and Pillow")
+
+    run_scan(extract_img.iter_batch_files(args.paths, args.file_list), extract_args)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+
+__description__ = 'Long running extract_img.py service on a Unix socket, with warm engines and a bounded queue'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Every extract_img.py run pays for importing scipy, starting tesseract and LibreOffice again. The daemon
+does that once and then takes documents over a Unix socket, as a path or as bytes. A fixed set of
+worker threads runs the extractions, so the tesseract engine each of them keeps, the OCR thread pool,
+the LibreOffice pool, the OCR cache and the near-duplicate index stay warm between documents.
+
+There are workers + queue slots. A request has to get a slot before its document is read off the socket,
+so a burst of clients waits, or is told busy after --admit-timeout, instead of piling documents up in
+memory.
+
+Protocol, one request per connection, every line is JSON:
+    {"path": "/abs/path/doc.doc", "options": {"ocr": true}}
+    {"size": 123456, "name": "doc.doc"}, answered with {"ready": true} once there is a slot, then the
+                                         client sends the 123456 bytes of the document
+    {"command": "stats"}
+The answer is one line, {"images": [...], "stats": {...}, "truncated": null} like extract_images, or {"error": "..."}.
+"busy" means no slot came free in time. Only the options in REQUEST_OPTIONS can be set per request,
+everything else comes from the extract_img.py options the daemon was started with. The budgets in
+LIMIT_OPTIONS can only be made tighter, a request can't loosen or turn off the daemon's, and
+ocr_tiles can't be more than the daemon's.
+
+Usage:
+$ python extract_daemon.py --socket /tmp/doctools.sock --workers 4 --queue 16 -- -o --ocr-cache ~/.cache/doctools_ocr.sqlite
+$ python daemon_client.py --socket /tmp/doctools.sock ../test_docs/image_in_doc.doc
+
+History:
+  2026/10/18: start
+  2026/10/18: Requests that aren't a JSON object, and options of the wrong type, get an error reply
+  2026/10/18: Per request budgets can only be tighter than the daemon's
+  2026/10/18: So can max_decompressed_size, a request turned off the decompression bomb guard with 0
+  2026/10/18: A request's ocr_tiles is capped at the daemon's, each count kept a thread pool of that size
+"""
+
+import argparse
+import copy
+import io
+import json
+import numbers
+import os
+import signal
+import stat
+import sys
+import threading
+
+try:
+    import SocketServer as socketserver
+    import Queue as queue
+except ImportError:
+    import socketserver
+    import queue
+
+import extract_img
+import pipeline_stats
+
+REQUEST_OPTIONS = ["ocr", "ocr_resize", "ocr_no_preprocess", "ocr_preprocess", "ocr_backend", "max_decompressed_size",
+                   "near_dup_radius", "uid_verify_rate", "ocr_tiles", "max_seconds", "max_records", "max_total_decompressed",
+                   "max_compression_ratio", "max_ocr_images"]
+# budgets a request can only make tighter than the daemon's, 0 in a request keeps the daemon's
+LIMIT_OPTIONS = ["max_decompressed_size", "max_seconds", "max_records", "max_total_decompressed", "max_compression_ratio",
+                 "max_ocr_images"]
+MAX_REQUEST_LINE = 64 * 1024
+
+# the extract_img.py command line options by name, their default, type and choices check request options
+OPTION_ACTIONS = dict((action.dest, action) for action in extract_img.my_argparser._actions)
+
+
+class BusyError(Exception):
+    pass
+
+
+class extract_job():
+
+    def __init__(self, name, source, args):
+        self.name = name
+        self.source = source
+        self.args = args
+        self.response = None
+        self.done = threading.Event()
+
+
+class extract_service():
+    '''
+    Runs the jobs on the worker threads, at most workers + queue_size requests are admitted at once
+    '''
+
+    def __init__(self, base_args, workers=2, queue_size=8, admit_timeout=30, max_document_size=256 * 1024 * 1024):
+        self.base_args = base_args
+        self.admit_timeout = admit_timeout
+        self.max_document_size = max_document_size
+        self.slots = queue.Queue(workers + queue_size) # one item per admitted request, Queue.put has a timeout on python 2
+        self.jobs = queue.Queue()
+        self.totals = pipeline_stats.pipeline_stats()
+        self.busy = 0
+        self.warm_up()
+
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self.worker, name="extract-worker-{}".format(i))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def warm_up(self):
+        '''
+        Loads everything the first document would otherwise have to wait for
+        '''
+        if self.base_args.ocr and extract_img.load_ocr():
+            extract_img.ocr_engine.get_pool(self.base_args.ocr_workers)
+            if self.base_args.ocr_tiles > 1:
+                extract_img.ocr_engine.get_tile_pool(self.base_args.ocr_tiles)
+            if self.base_args.ocr_cache:
+                import ocr_cache
+                ocr_cache.open_cache(self.base_args.ocr_cache, self.base_args.ocr_cache_size * 1024 * 1024)
+            if self.base_args.near_dup_index:
+                import perceptual_hash
+                perceptual_hash.open_index(self.base_args.near_dup_index)
+        extract_img.libreoffice_available()
+
+    def request_args(self, options):
+        if options is None:
+            options = {}
+        if not isinstance(options, dict):
+            raise ValueError("options must be a JSON object")
+        args = copy.copy(self.base_args)
+        for name, value in options.items():
+            if name not in REQUEST_OPTIONS:
+                raise ValueError("option {} can't be set per request".format(name))
+            value = option_value(name, value)
+            if name in LIMIT_OPTIONS:
+                value = tighter_limit(getattr(self.base_args, name), value)
+            elif name == "ocr_tiles":
+                # every tile count gets a thread pool of its own that is kept, no more than the daemon's
+                value = max(0, min(value, self.base_args.ocr_tiles))
+            setattr(args, name, value)
+        return args
+
+    def admit(self):
+        try:
+            if self.admit_timeout > 0:
+                self.slots.put(None, True, self.admit_timeout)
+            else:
+                self.slots.put_nowait(None)
+        except queue.Full:
+            self.busy += 1
+            raise BusyError("busy")
+
+    def release(self):
+        self.slots.get_nowait()
+
+    def submit(self, job):
+        self.jobs.put(job)
+        job.done.wait()
+        return job.response
+
+    def worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            job.response = self.run(job)
+            job.done.set()
+
+    def run(self, job):
+        stats = pipeline_stats.pipeline_stats()
+        try:
+            images = extract_img.analyze_document(job.source, job.args, stats, job.name)
+            response = {"images": [extract_img.result_to_dict(job.name, result) for result in images],
+                        "stats": stats.summary(), "truncated": images.truncated}
+        except Exception as e:
+            stats.count("errors")
+            response = {"error": "{}: {}".format(type(e).__name__, e)}
+        self.totals.merge(stats.summary())
+        return response
+
+    def status(self):
+        return {"stats": self.totals.summary(), "admitted": self.slots.qsize(), "queued": self.jobs.qsize(),
+                "busy": self.busy}
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+def option_value(name, value):
+    '''
+    Checks a request option the way the command line would and returns it, raises ValueError if it
+    isn't the type of the option or one of its choices
+    '''
+    action = OPTION_ACTIONS[name]
+    if isinstance(action.default, bool):
+        valid = isinstance(value, bool)
+    elif isinstance(value, bool):
+        valid = False
+    elif action.type is int:
+        valid = isinstance(value, numbers.Integral)
+    elif action.type is float:
+        valid = isinstance(value, numbers.Real)
+    else:
+        valid = isinstance(value, (numbers.Integral, type(u""), str))
+    if valid and action.type is not None and not isinstance(action.default, bool):
+        try:
+            value = action.type(value)
+        except (TypeError, ValueError):
+            valid = False
+    if not valid or (action.choices and value not in action.choices):
+        raise ValueError("option {} can't be {}".format(name, json.dumps(value)))
+    return value
+
+
+def tighter_limit(limit, value):
+    '''
+    0 means no limit in the daemon's options, in a request it means no override, so a client can't
+    loosen or turn off a budget the operator set
+    '''
+    if value <= 0:
+        return limit
+    return value if limit <= 0 else min(limit, value)
+
+
+def check_request(request, max_document_size):
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    for field in ["command", "path", "name"]:
+        if field in request and not isinstance(request[field], (type(u""), str)):
+            raise ValueError("{} must be a string".format(field))
+    if "command" in request:
+        if request["command"] != "stats":
+            raise ValueError("unknown command {}".format(json.dumps(request["command"])))
+        return
+    if "path" in request:
+        return
+    size = request.get("size")
+    if not isinstance(size, numbers.Integral) or isinstance(size, bool) or not 0 <= size <= max_document_size:
+        raise ValueError("size missing or over the {} byte limit".format(max_document_size))
+
+
+class request_handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        service = self.server.service
+        try:
+            request = json.loads(self.rfile.readline(MAX_REQUEST_LINE).decode("utf-8"))
+            check_request(request, service.max_document_size)
+            if request.get("command") == "stats":
+                self.reply(service.status())
+                return
+            args = service.request_args(request.get("options"))
+            service.admit()
+        except (ValueError, BusyError) as e:
+            self.reply({"error": str(e)})
+            return
+
+        try:
+            if "path" in request:
+                name = source = request["path"]
+            else:
+                # only read once admitted, so memory is bounded by the number of slots
+                self.reply({"ready": True})
+                data = self.rfile.read(int(request["size"]))
+                if len(data) != int(request["size"]):
+                    return # client went away
+                name = request.get("name", "")
+                source = io.BytesIO(data)
+            self.reply(service.submit(extract_job(name, source, args)))
+        finally:
+            service.release()
+
+    def reply(self, response):
+        self.wfile.write((json.dumps(response, sort_keys=True) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class unix_server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path, service):
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            raise IOError("{} exists and is not a socket".format(socket_path))
+        os.remove(socket_path) # left over from a daemon that didn't shut down
+    server = unix_server(socket_path, request_handler)
+    server.service = service
+    os.chmod(socket_path, 0o600)
+
+    # serve_forever has to be stopped from another thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser(epilog="Options after -- are extract_img.py options, used for every document")
+    my_argparser.add_argument("--socket", type=str, help="Unix socket to listen on", required=True)
+    my_argparser.add_argument("--workers", type=int, help="Documents extracted at the same time", default=2)
+    my_argparser.add_argument("--queue", type=int, help="Documents admitted and waiting for a worker", default=8)
+    my_argparser.add_argument("--admit-timeout", type=float, help="Seconds a request waits for a slot before it is told busy, 0 means don't wait", default=30)
+    my_argparser.add_argument("--max-document-size", type=int, help="Largest document in MB accepted as bytes", default=256)
+
+    argv = sys.argv[1:]
+    extract_argv = []
+    if "--" in argv:
+        extract_argv = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+    args = my_argparser.parse_args(argv)
+    extract_args = extract_img.my_argparser.parse_args(extract_argv)
+
+    service = extract_service(extract_args, args.workers, args.queue, args.admit_timeout,
+                              args.max_document_size * 1024 * 1024)
+    serve(args.socket, service)
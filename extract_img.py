@@ -16,11 +16,22 @@ Usage:
 $ python plugin_extract_img.py -f ../test_docs/image_in_doc.doc -s test
 ['image sha256 hash is: 5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf']
 
-$ file test/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf 
-test/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf: JPEG image data, JFIF standard 1.02, resolution (DPI), density 300x300, segment length 16, Exif Standard: [TIFF image data, big-endian, direntries=7, orientation=upper-left, xresolution=98, yresolution=106, resolutionunit=2, software=Adobe Photoshop CS3 Windows, datetime=2008:07:01 09:49:29], baseline, precision 8, 2170x1560, components 3
+$ file test/57/37/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf 
+test/57/37/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf: JPEG image data, JFIF standard 1.02, resolution (DPI), density 300x300, segment length 16, Exif Standard: [TIFF image data, big-endian, direntries=7, orientation=upper-left, xresolution=98, yresolution=106, resolutionunit=2, software=Adobe Photoshop CS3 Windows, datetime=2008:07:01 09:49:29], baseline, precision 8, 2170x1560, components 3
 
-$ sha256sum test/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf 
-5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf  test/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf
+$ sha256sum test/57/37/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf 
+5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf  test/57/37/5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf
+
+List the BLIPs without reading them, then extract one by its offset:
+$ python extract_img.py -f ../test_docs/image_in_doc.doc --list
+[{'offset': 1227, 'length': 186337, 'compressed': False, 'pic_type': 'jpeg', ...}]
+$ python extract_img.py -f ../test_docs/image_in_doc.doc --blip 1227 -s test
+
+Batch mode, one JSON line per image:
+$ python extract_img.py -b ../test_docs '../more_docs/*.doc' -j 8 --jsonl results.jsonl
+
+Nightly rescans, documents unchanged since the last run are replayed from the manifest, see scan_manifest.py:
+$ python extract_img.py -b /mnt/share -j 8 --jsonl results.jsonl --manifest ~/.cache/doctools_manifest.sqlite
 
 
 History:
@@ -28,6 +39,31 @@ History:
   2020/01/10: Changed to standalone module, instead of plugin for oledump
   2020/05/13: Added OCR using pytesseract
   2020/05/21: Output Picture name and type. Use libreoffice if available to convert EMF/WMF to PNG for OCR
+  2026/10/18: Parse the Data stream from an mmap-backed buffer, BLIP payloads are passed on as zero-copy views
+  2026/10/18: Added batch mode, documents are spread over a process pool and results written as JSONL
+  2026/10/18: Added on disk OCR cache keyed by image sha256 and OCR settings
+  2026/10/18: EMF/WMF are converted by a pool of long lived LibreOffice processes, once per document
+  2026/10/18: Added vectorized sample k-means and Otsu preprocessing, --ocr-preprocess picks the engine
+  2026/10/18: OCR runs on a pool of threads with warm tesseract engines, results kept in document order
+  2026/10/18: Added --list index mode that only walks record headers, and extract_blip to pull one BLIP out later
+  2026/10/18: Compressed metafiles are decompressed in chunks straight into the hash and output file, with a size limit
+  2026/10/18: Fixed size records are declared in records.py and decoded with one precompiled struct each
+  2026/10/18: Added --stats per stage timings and counters, totalled over batch runs, and --profile for the record walk
+  2026/10/18: Added extract_images library API, OCR, imaging and LibreOffice are only loaded when first used
+  2026/10/18: Split result_to_dict out of result_to_json for extract_daemon.py
+  2026/10/18: Added --near-dup-index, images within a few dHash bits of one OCR'd before reuse its OCR results
+  2026/10/18: Images are saved to a sharded content addressed store, written once in binary and renamed into place
+  2026/10/18: BLIPs with an rgbUid seen before copy the earlier result, --uid-verify-rate rechecks a sample of them
+  2026/10/18: --ocr-resize auto, the default, scales for OCR from the picmid display size or the image dpi
+  2026/10/18: Added --ocr-tiles, large images are OCR'd in overlapping strips in parallel and the text merged
+  2026/10/18: Added per document budgets, a document over one stops early and its partial result is flagged truncated
+  2026/10/18: Added --manifest, batch mode replays or skips documents scanned before with the same version and options
+  2026/10/18: read_stream_buffer takes the directory entry when the caller has it, see doc_scanner.py
+  2026/10/18: --uid-cache is off by default and only matches within a document or batch run, copies are charged to the budgets
+  2026/10/18: --ocr-resize defaults to 2 again until auto is measured, auto keys the OCR cache by display size
+  2026/10/18: Images saved from a document passed as data are recorded under its sha256, never an empty name
+  2026/10/18: A truncated compressed metafile is an error again, it was hashed and saved as far as it went.
+              Data after the end of the zlib stream no longer loops forever on python 2
 
 Todo:
     - Test on other Microsoft Office files, only done DOC
@@ -43,26 +79,318 @@ import io
 import hashlib
 import zlib
 import struct
+import binascii
+import mmap
+import os
+import sys
+import glob
+import json
+import signal
+import time
+import random
+from collections import OrderedDict
+
+import records
+import pipeline_stats
+
+# OCR, imaging and LibreOffice are only looked for the first time they are needed, see load_ocr and
+# libreoffice_available. None means not checked yet.
+ENABLE_OCR = None
+ENABLE_LIBREOFFICE = None
+
+
+def load_ocr():
+    '''
+    Imports pytesseract, PIL, numpy and scipy on first use, a run without --ocr never loads them
+    '''
+    global ENABLE_OCR, pytesseract, Image, np, scipy, img_preprocess, ocr_engine
+    if ENABLE_OCR is None:
+        try:
+            import pytesseract
+            from PIL import Image
+            import numpy as np
+            import scipy
+            import scipy.misc
+            import scipy.cluster
+            import img_preprocess
+            import ocr_engine
+#            from unidecode import unidecode
+
+            ENABLE_OCR = True
+        except:
+            ENABLE_OCR = False
+    return ENABLE_OCR
 
-try:
-    import pytesseract
-    from PIL import Image
-    import binascii
-    import numpy as np
-    import scipy
-    import scipy.misc
-    import scipy.cluster
-#    from unidecode import unidecode
-
-    ENABLE_OCR = True
-except:
-    ENABLE_OCR = False
+
+def libreoffice_available():
+    global ENABLE_LIBREOFFICE
+    if ENABLE_LIBREOFFICE is None:
+        import metafile_converter
+        ENABLE_LIBREOFFICE = metafile_converter.find_office() is not None
+    return ENABLE_LIBREOFFICE
 
 try:
-    import subprocess
-    ENABLE_LIBREOFFICE = subprocess.call(['which', 'libreoffice']) == 0
-except:
-    ENABLE_LIBREOFFICE = False
+    buffer  # zlib on python 2 only takes the old style buffer interface, not memoryview
+
+    def buffer_view(data, offset, size):
+        return buffer(data, offset, size)
+except NameError:
+    def buffer_view(data, offset, size):
+        return memoryview(data)[offset:offset + size]
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+DECOMPRESS_CHUNK_SIZE = 256 * 1024
+
+# --ocr-resize auto, see ocr_scale
+OCR_TEXT_POINTS = 8.0 # smallest text a lure can use and still be read on the page
+OCR_TEXT_PIXELS = 32.0 # tesseract reads best with capitals around 30 pixels high
+SCREEN_DPI = 96.0
+OCR_MIN_SCALE = 0.5
+OCR_MAX_SCALE = 4.0
+OCR_MAX_PIXELS = 16 * 1024 * 1024
+
+BUDGET_CHECK_RECORDS = 256 # the clock is read every this many records
+RATIO_MIN_OUTPUT = 1024 * 1024 # small BLIPs inflate by a lot legitimately, a blank EMF compresses 1000:1
+
+
+class DecompressionLimitExceeded(Exception):
+    pass
+
+
+def stream_decompress(data, sinks, max_size, chunk_size=DECOMPRESS_CHUNK_SIZE):
+    '''
+    Inflates data a chunk at a time and hands every chunk of output to each of the sinks, so memory is
+    bounded by chunk_size instead of the size of the metafile. Input is fed in chunks as well, on python 2
+    unconsumed_tail is a copy of whatever input is left. Raises DecompressionLimitExceeded once more
+    than max_size bytes come out, 0 means no limit, and zlib.error like zlib.decompress if the stream is
+    truncated or corrupt. Returns the decompressed size.
+    '''
+    decompressor = zlib.decompressobj()
+    total = 0
+    for offset in range(0, len(data), chunk_size):
+        pending = buffer_view(data, offset, chunk_size)
+        while True:
+            out = decompressor.decompress(pending, chunk_size)
+            total += len(out)
+            if max_size and total > max_size:
+                raise DecompressionLimitExceeded("decompressed size over {} bytes".format(max_size))
+            for sink in sinks:
+                sink(out)
+            if decompressor.unused_data:
+                break # the stream ended, python 2 keeps handing back what follows it as unconsumed_tail
+            pending = decompressor.unconsumed_tail
+            if not pending and len(out) < chunk_size:
+                break # a full chunk of output can mean zlib still has more buffered, ask again
+        if decompressor.unused_data:
+            break
+
+    # what came out so far has gone to the sinks, the callers drop it on the error
+    if not stream_ended(decompressor):
+        raise zlib.error("incomplete or truncated stream")
+    out = decompressor.flush()
+    total += len(out)
+    if max_size and total > max_size:
+        raise DecompressionLimitExceeded("decompressed size over {} bytes".format(max_size))
+    for sink in sinks:
+        sink(out)
+    return total
+
+
+def stream_ended(decompressor):
+    '''
+    True once the whole zlib stream has been inflated. Decompress objects have no eof on python 2, but
+    any input after the end of the stream is only kept in unused_data, so one more byte tells.
+    '''
+    if hasattr(decompressor, "eof"):
+        return decompressor.eof
+    if decompressor.unused_data:
+        return True
+    try:
+        decompressor.decompress(b"\x00")
+    except zlib.error:
+        return False
+    return bool(decompressor.unused_data)
+
+
+class BudgetExceeded(Exception):
+    '''
+    args[0] is the option name of the budget that ran out, without the leading --max-
+    '''
+    pass
+
+
+class document_budget():
+    '''
+    The limits one document gets from --max-seconds, --max-records, --max-total-decompressed,
+    --max-compression-ratio and --max-ocr-images, 0 means no limit. The clock starts when the budget is made.
+    '''
+
+    def __init__(self, args):
+        self.deadline = time.time() + args.max_seconds if args.max_seconds else None
+        self.max_records = args.max_records
+        self.max_decompressed = args.max_total_decompressed * 1024 * 1024
+        self.max_ratio = args.max_compression_ratio
+        self.ocr_left = args.max_ocr_images or None
+        self.decompressed = 0
+
+    def check_time(self):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise BudgetExceeded("seconds")
+
+    def remaining(self):
+        '''
+        Seconds left, None with no time limit
+        '''
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def check_records(self, walked):
+        '''
+        Returns the record count to check again at
+        '''
+        if self.max_records and walked > self.max_records:
+            raise BudgetExceeded("records")
+        self.check_time()
+        if self.max_records:
+            return min(walked + BUDGET_CHECK_RECORDS, self.max_records + 1)
+        return walked + BUDGET_CHECK_RECORDS
+
+    def take_ocr(self):
+        '''
+        False once --max-ocr-images images have gone to OCR
+        '''
+        if self.ocr_left is None:
+            return True
+        if self.ocr_left == 0:
+            return False
+        self.ocr_left -= 1
+        return True
+
+    def charge_decompressed(self, compressed_size, inflated, size):
+        '''
+        Adds size bytes to a metafile that had inflated to inflated bytes so far, returns its new total
+        '''
+        inflated += size
+        self.decompressed += size
+        if self.max_decompressed and self.decompressed > self.max_decompressed:
+            raise BudgetExceeded("total_decompressed")
+        if self.max_ratio and inflated > RATIO_MIN_OUTPUT and inflated > self.max_ratio * compressed_size:
+            raise BudgetExceeded("compression_ratio")
+        self.check_time()
+        return inflated
+
+    def decompress_sink(self, compressed_size):
+        '''
+        Goes first in the stream_decompress sinks, so a chunk over the budget isn't written anywhere
+        '''
+        inflated = [0]
+
+        def sink(data):
+            inflated[0] = self.charge_decompressed(compressed_size, inflated[0], len(data))
+        return sink
+
+
+class document_images(list):
+    '''
+    The results of one document, truncated is the budget that ran out, or None if it was done in full
+    '''
+    truncated = None
+
+
+def stream_runs(ole, stream_path, entry):
+    '''
+    Follows the FAT chain of a stream, yields (file offset, size) for each run of contiguous sectors
+    '''
+    sect = entry.isectStart
+    remaining = entry.size
+    while remaining > 0:
+        if sect >= len(ole.fat):
+            raise IOError("incorrect OLE FAT, sector index out of range in stream {}".format(stream_path))
+
+        run_start = sect
+        run_size = ole.sectorsize
+        while run_size < remaining and ole.fat[sect] == sect + 1:
+            sect += 1
+            run_size += ole.sectorsize
+        run_size = min(run_size, remaining)
+
+        yield ole.sectorsize * (run_start + 1), run_size
+        remaining -= run_size
+        sect = ole.fat[sect]
+
+
+def map_document(ole):
+    try:
+        return mmap.mmap(ole.fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, IOError, ValueError, EnvironmentError):
+        return None  # opened from bytes, or a file that can't be mapped
+
+
+def read_stream_buffer(ole, stream_path, entry=None):
+    '''
+    Get an OLE stream as a buffer the parser can hand out views into, instead of slicing copies of every
+    BLIP out of one big string. The FAT chain is followed here instead of using ole.openstream, which joins
+    every sector into a string and then copies that into a BytesIO.
+
+    When the whole stream is one run of sectors, which is how Word usually writes the Data stream, the
+    result is a view into a read only mmap of the document itself, so nothing is read until it is used.
+    Otherwise the runs are copied into an anonymous mmap. Pass the directory entry if it was found already.
+    '''
+    if entry is None:
+        entry = ole.direntries[ole._find(stream_path)]
+    if entry.size == 0:
+        return b""
+    if entry.size < ole.minisectorcutoff:  # lives in the mini stream, small enough to let olefile read it
+        with ole.openstream(stream_path) as stream:
+            return stream.read()
+
+    runs = list(stream_runs(ole, stream_path, entry))
+    if len(runs) == 1:
+        document = map_document(ole)
+        if document is not None and runs[0][0] + runs[0][1] <= len(document):
+            return buffer_view(document, runs[0][0], runs[0][1])
+
+    data = mmap.mmap(-1, entry.size)
+    for offset, run_size in runs:
+        ole.fp.seek(offset)
+        while run_size > 0:
+            chunk = ole.fp.read(min(run_size, STREAM_CHUNK_SIZE))
+            if not chunk:
+                raise IOError("incomplete OLE sector in stream {}".format(stream_path))
+            data.write(chunk)
+            run_size -= len(chunk)
+    data.seek(0)
+    return data
+
+
+class seen_blips():
+    '''
+    Results of the BLIPs seen so far, by the rgbUid Office stores in front of the image data. The first
+    BLIP with a uid is processed as usual, the ones after it copy its result without being decompressed,
+    hashed, saved or OCR'd. Least recently used entries are dropped past size.
+
+    The uid comes from the document, so one is only trusted within a document, or a batch run that
+    makes one seen_blips and passes it to every document. Library calls and daemon requests don't share one.
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        '''
+        Returns the earlier result, None if the uid hasn't been seen and False if it was caught spoofed
+        '''
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.entries[key] = entry
+        return entry
+
+    def put(self, key, result):
+        self.entries[key] = result
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
 
 
 class extract_and_hash_image():
@@ -70,28 +398,78 @@ class extract_and_hash_image():
 
     name = 'Extract and sha256 hash image plugin. save image with --pluginoptions save=<folder_location>'
 
-    def __init__(self, stream, args):
+    def __init__(self, stream, args, stats=None, document="", budget=None, seen=None):
         # Storing the arguments for later use by Analyze method
         self.stream = stream
         self.args = args
+        self.stats = stats if stats is not None else pipeline_stats.pipeline_stats()
+        self.budget = budget if budget is not None else document_budget(args)
+        self.truncated = None # the budget that ran out
+        self.records_walked = 0
+        self.next_budget_check = 0
+        self.document = document # recorded as a source of every saved image
         self.save = self.args.savefolder
+        self.store = None
+        self.stored = [] # (sha256, pic_type, pic_name) for the store's index, written once per document
+        if self.save:
+            if not document:
+                raise ValueError("saved images need the name of the document they came from")
+            import image_store
+            self.store = image_store.open_store(self.save)
         self.ocr = self.args.ocr
+        self.ocr_cache = None
+        if self.ocr and self.args.ocr_cache:
+            import ocr_cache
+            self.ocr_cache = ocr_cache.open_cache(self.args.ocr_cache, self.args.ocr_cache_size * 1024 * 1024)
+        self.near_dups = None
+        if self.ocr and self.args.near_dup_index and load_ocr():
+            import perceptual_hash
+            self.near_dups = perceptual_hash.open_index(self.args.near_dup_index)
         self.index = 0
-        self.result = []
+        self.result = document_images()
+        self.index_only = False
+        self.blip_index = []
+        self.pending_metafiles = [] # converted to PNG together once the whole document has been walked
+        self.display_size = None # inches the current picture is shown at, from its picmid
+        self.pending_ocr = [] # (result, job, OCR settings key) in document order
+        self.seen_blips = seen # results by rgbUid, this document's own unless a batch run passes its seen_blips
+        if seen is None and self.args.uid_cache > 0:
+            self.seen_blips = seen_blips(self.args.uid_cache)
+        self.new_uids = {} # only shared once the document is done and their OCR text is in
+        self.uid_copies = [] # (result, earlier result), filled in once the earlier one has its OCR text
+        self.ocr_pool = None
+        if self.ocr and load_ocr():
+            self.ocr_pool = ocr_engine.get_pool(self.args.ocr_workers)
 
         self.img_info = [] # TODO make dict when we can parse shape name and other info. 
 
     def Analyze(self):
-        curindex = 0
-
-
         if self.stream:
-            while(self.index < len(self.stream)):
-                curindex = self.index
-                data_element_size = self.read_dword()
-                self.parse_PICAndOfficeArtData(curindex + data_element_size) # could probably make generic classes so we can read and write the records
-
-                self.index = curindex + data_element_size # skip element
+            try:
+                if self.args.profile:
+                    pipeline_stats.profiled(self.args.profile, self.walk)
+                else:
+                    self.walk()
+            except BudgetExceeded as e:
+                self.truncate(e.args[0]) # what was found so far still gets converted, OCR'd and saved
+            try:
+                self.budget.check_time()
+                self.convert_pending_metafiles()
+                self.collect_ocr()
+            except BudgetExceeded as e:
+                self.truncate(e.args[0])
+                self.drop_pending()
+            for result, earlier in self.uid_copies:
+                result.update((key, value) for key, value in earlier.items() if key != "pic_name")
+            self.uid_copies = []
+            for key, result in self.new_uids.items():
+                if result is False or not self.truncated: # a truncated document may not have all its OCR text
+                    self.seen_blips.put(key, result)
+            self.new_uids = {}
+            if self.store:
+                with self.stats.stage("save"):
+                    self.store.record(self.stored, self.document)
+                self.stored = []
 
             if self.img_info:
                 self.ran = True
@@ -99,38 +477,95 @@ class extract_and_hash_image():
                 # for val in self.img_info:
                 #    result.append("image sha256 hash is: {}".format(val))
 
+        self.result.truncated = self.truncated
         return self.result
 
+    def truncate(self, budget):
+        if self.truncated is None:
+            self.truncated = budget
+            self.stats.count("truncated." + budget)
+
+    def drop_pending(self):
+        '''
+        Gives up on the metafiles and OCR jobs still waiting, their results keep empty ocr_text
+        '''
+        for _, image_data, _ in self.pending_metafiles:
+            if hasattr(image_data, "close"):
+                image_data.close()
+        self.pending_metafiles = []
+        self.pending_ocr = [] # pool threads can't be stopped, a job already running finishes and is thrown away
+
+    def Index(self):
+        '''
+        Only walks the record headers, returns where each BLIP is without reading, hashing or decompressing it.
+        Use extract_blip with the stream and an entry to get the image data later.
+        '''
+        self.index_only = True
+        if self.stream:
+            try:
+                self.walk()
+            except BudgetExceeded as e:
+                self.truncate(e.args[0])
+        return self.blip_index
+
+    def walk(self):
+        curindex = 0
+        self.records_walked = 0
+        self.next_budget_check = 0
+        try:
+            with self.stats.stage("walk"):
+                while(self.index + 4 <= len(self.stream)):
+                    curindex = self.index
+                    data_element_size = self.read_dword()
+                    if data_element_size < 4:
+                        break # malformed lcb, would never move forward
+                    self.parse_PICAndOfficeArtData(curindex + data_element_size) # could probably make generic classes so we can read and write the records
+
+                    self.index = curindex + data_element_size # skip element
+        finally:
+            self.stats.count("records", self.records_walked)
+
     
     def read_byte(self): 
-        val = ord(self.stream[self.index])
+        val = struct.unpack_from("<B", self.stream, self.index)[0]
         self.index += 1
         return val
 
     def read_bytes(self, num):
-        val = self.stream[self.index:self.index + num]
+        '''
+        Returns a view into the stream instead of a copy, use bytes() on it if a copy is needed
+        '''
+        val = buffer_view(self.stream, self.index, num)
         self.index += num
         return val
 
     def read_sword(self): # could use read bytes, and then do unpacking
-        val = struct.unpack("<h", self.stream[self.index:self.index + 2])[0]
+        val = struct.unpack_from("<h", self.stream, self.index)[0]
         self.index += 2
         return val
 
     def read_sdword(self):
-        val = struct.unpack("<i", self.stream[self.index:self.index + 4])[0]
+        val = struct.unpack_from("<i", self.stream, self.index)[0]
         self.index += 4
         return val
 
     def read_word(self):
-        val = struct.unpack("<H", self.stream[self.index:self.index + 2])[0]
+        val = struct.unpack_from("<H", self.stream, self.index)[0]
         self.index += 2
         return val
 
     def read_dword(self):
-        val = struct.unpack("<I", self.stream[self.index:self.index + 4])[0]
+        val = struct.unpack_from("<I", self.stream, self.index)[0]
         self.index += 4
         return val
+
+    def read_record(self, record_format):
+        '''
+        Decodes a fixed size record from records.py with one unpack
+        '''
+        val = record_format.unpack_from(self.stream, self.index)
+        self.index += record_format.size
+        return val
     
     
     def parse_OfficeArtRecordHeader(self):
@@ -142,11 +577,12 @@ class extract_and_hash_image():
             1 uint recLen
         '''
     
-        rec_ver_instance = self.read_word()
-        recType = self.read_word()
-        recLen = self.read_dword()
-    
-        return rec_ver_instance & 0xF, (rec_ver_instance & 0xFFF0) >> 4, recType, recLen
+        header = self.read_record(records.OfficeArtRecordHeader)
+        self.records_walked += 1
+        if self.records_walked >= self.next_budget_check:
+            self.next_budget_check = self.budget.check_records(self.records_walked)
+
+        return header.rec_ver_instance & 0xF, (header.rec_ver_instance & 0xFFF0) >> 4, header.recType, header.recLen
     
     
     
@@ -159,12 +595,7 @@ class extract_and_hash_image():
             1 ushort swHMF
         '''
     
-        mm = self.read_word()
-        xExt = self.read_word()
-        yExt = self.read_word()
-        swHMF = self.read_word()
-        
-        return mm, xExt, yExt, swHMF
+        return self.read_record(records.mfpf)
         
     
     def parse_innerHeader(self):
@@ -176,13 +607,7 @@ class extract_and_hash_image():
             1 uint padding2
         '''
     
-        grf = self.read_dword()
-        self.index += 4
-        mmPM = self.read_word()
-        # padding2 = struct.unpack("<I".read(4))
-        self.index += 4
-    
-        return grf, mmPM
+        return self.read_record(records.innerHeader)
         
     def parse_picmid(self):
         '''
@@ -205,23 +630,7 @@ class extract_and_hash_image():
             1 ushort dyaReserved3
         '''
     
-        dxaGoal = self.read_sword()
-        dyaGoal = self.read_sword()
-        mx = self.read_word()
-        my = self.read_word()
-        self.index += 8
-        self.index += 1
-        bpp = self.read_byte()
-        # can parse Brc80, but haven't added in 
-        self.index += 16
-        # above_Brc80 = self.stream.read(4)
-        # left_Brc80 = self.stream.read(4)
-        # below_Brc80 = self.stream.read(4)
-        # right_Brc80 = self.stream.read(4)
-
-        self.index += 4
-    
-        return dxaGoal, dyaGoal, mx, my, bpp #, above_Brc80, left_Brc80, below_Brc80, right_Brc80
+        return self.read_record(records.picmid) # Brc80 structs are kept as raw bytes, can parse them later
     
     
     def parse_OfficeArtFBSE(self):
@@ -242,80 +651,243 @@ class extract_and_hash_image():
             OfficeArtBlip Record [MS-ODRAW] 2.2.23, poss types EMF, WMF, PICT, JPEG, PNG, DIB, TIFF, JPEG
         '''
 
-        btWin32 = self.read_byte()
-        btMacOS = self.read_byte()
-        md4 = self.read_bytes(16)
-        tag = self.read_word()
-        blip_size = self.read_dword()
-        cRef = self.read_dword()
-        self.index += 4 # skip over MSOFO struct
-        self.index += 1 # skip over unused1
-        cbName = self.read_byte()
-        self.index += 2 # skip over unused2 and unused3
-        if cbName > 0:
-            nameData = self.read_bytes(cbName)
+        fbse = self.read_record(records.OfficeArtFBSE)
+        if fbse.cbName > 0:
+            nameData = bytes(self.read_bytes(fbse.cbName))
         else:
             nameData = ""
     
         rec_ver, recInstance, recType, recLen = self.parse_OfficeArtRecordHeader()
         if recType == 0xf01a:
             pic_type = "emf"
-            image_data, is_compressed = self.parse_img_type_1(recInstance, recLen)
-            if is_compressed:
-                image_data = zlib.decompress(image_data)
+            image_data, blip = self.parse_img_type_1(recInstance, recLen)
         elif recType == 0xf01b:
             pic_type = "wmf"
-            image_data, is_compressed = self.parse_img_type_1(recInstance, recLen)
-            if is_compressed:
-                image_data = zlib.decompress(image_data)
+            image_data, blip = self.parse_img_type_1(recInstance, recLen)
         elif recType == 0xf01c:
             pic_type = "pict"
-            image_data, is_compressed = self.parse_img_type_1(recInstance, recLen)
-            if is_compressed:
-                image_data = zlib.decompress(image_data)
+            image_data, blip = self.parse_img_type_1(recInstance, recLen)
         elif recType == 0xf01d or recType == 0xf02a:
             pic_type = "jpeg"
-            image_data = self.parse_img_type_2(recInstance, recLen)
+            image_data, blip = self.parse_img_type_2(recInstance, recLen)
         elif recType == 0xf01e:
             pic_type = "png"
-            image_data = self.parse_img_type_2(recInstance, recLen)
+            image_data, blip = self.parse_img_type_2(recInstance, recLen)
         elif recType == 0xf01f:
             pic_type = "dib"
-            image_data = self.parse_img_type_2(recInstance, recLen)
+            image_data, blip = self.parse_img_type_2(recInstance, recLen)
         elif recType == 0xf029:
             pic_type = "tiff"
-            image_data = self.parse_img_type_2(recInstance, recLen)
-    
+            image_data, blip = self.parse_img_type_2(recInstance, recLen)
+        else:
+            self.index += recLen # not a BLIP, or one we don't know
+            return
+
+        if self.index_only:
+            blip.update({"pic_type": pic_type, "pic_name": nameData, "md4": binascii.hexlify(fbse.rgbUid).decode("ascii"),
+                         "cRef": fbse.cRef, "blip_size": fbse.size})
+            self.blip_index.append(blip)
+            return
+
+        self.stats.count("images." + pic_type)
+        uid_key = None
+        earlier = None
+        if self.seen_blips is not None and binascii.hexlify(fbse.rgbUid).decode("ascii") == blip["rgbUid"]:
+            # the FBSE and the BLIP both carry the uid, one that doesn't agree isn't trusted.
+            # the OCR settings are part of the key, a daemon request with OCR can't reuse one without
+            uid_key = (blip["rgbUid"], pic_type, blip["uncompressed_size"],
+                       self.ocr and ocr_settings_key(self.args, self.display_size))
+            earlier = self.new_uids.get(uid_key)
+            if earlier is None:
+                earlier = self.seen_blips.get(uid_key)
+            if earlier is False:
+                uid_key = earlier = None # spoofed before, always processed from now on
+            elif earlier is not None and random.random() >= self.args.uid_verify_rate and \
+                    (not self.store or self.store.contains(earlier["sha256"])):
+                if blip["compressed"]:
+                    # charged what inflating it would cost, a copy mustn't get round the budgets
+                    self.budget.charge_decompressed(blip["length"], 0, blip["uncompressed_size"])
+                self.copy_blip_result(earlier, nameData)
+                return
         img_hash = hashlib.sha256()
-        img_hash.update(image_data)
+        saved = False
+        if blip["compressed"]:
+            try:
+                image_data, saved = self.decompress_blip(image_data, img_hash, recType)
+            except (DecompressionLimitExceeded, zlib.error) as e:
+                self.stats.count("errors")
+                self.result.append({"pic_name": nameData, "sha256": "", "ocr_text": "", "freq_color": None,
+                                    "suspious words": False, "pic_type": pic_type, "error": str(e)})
+                return
+        else:
+            with self.stats.stage("hash", len(image_data)):
+                img_hash.update(image_data)
         self.img_info.append(img_hash.hexdigest())
-        freq_color = None
-        text = ""
-        save_loc = "{}/{}".format(self.save, img_hash.hexdigest())
         # TODO add type of image found to log
+        result = {"pic_name": nameData, "sha256": img_hash.hexdigest(), "ocr_text": "", "freq_color": None,
+                  "suspious words": False, "pic_type": pic_type}
+        self.result.append(result)
+        if uid_key is not None:
+            if earlier is None:
+                self.new_uids[uid_key] = result
+            elif earlier["sha256"] == img_hash.hexdigest():
+                self.stats.count("uid.verified")
+            else:
+                # same uid, different image, the uid was made to match something seen before
+                result["uid_mismatch"] = earlier["sha256"]
+                self.new_uids[uid_key] = False
+                self.stats.count("uid.mismatches")
 
-        if self.save:  # TODO move to class method
-            with open(save_loc, "w") as fo:
-                fo.write(image_data)
-        if self.ocr and ENABLE_OCR:
+        if self.store:
+            with self.stats.stage("save", 0 if saved else len(image_data)):
+                if saved:
+                    written = self.store.commit(saved, img_hash.hexdigest())
+                else:
+                    written = self.store.put(img_hash.hexdigest(), image_data)
+            self.stats.count("store.written" if written else "store.skipped")
+            self.stored.append((img_hash.hexdigest(), pic_type, decode_pic_name(nameData)))
+        cached = None
+        if self.ocr and load_ocr() and self.ocr_cache:
+            # on a hit the converted metafile isn't saved again, it was saved when it was first seen
+            with self.stats.stage("ocr_cache"):
+                cached = self.ocr_cache.get(img_hash.hexdigest(), ocr_settings_key(self.args, self.display_size))
+        if cached:
+            self.set_ocr_result(result, *cached)
+        elif self.ocr and load_ocr():
             if recType > 0xf01c:
-                text, freq_color = extract_text(image_data, self.args.ocr_resize, self.args.ocr_no_preprocess)
-            elif ENABLE_LIBREOFFICE and (recType == 0xf01a or recType == 0xf01b):
+                self.ocr_or_reuse(result, image_data, self.display_size)
+            elif libreoffice_available() and (recType == 0xf01a or recType == 0xf01b):
                 # TODO use pillow if windows to convert image and read in
-                temp_image_name = "/tmp/extracted_img.{}".format(pic_type)
-                with open(temp_image_name, "w") as fo:
-                    fo.write(image_data)
-                subprocess.call(["libreoffice", "--headless", "--convert-to", "png", "--outdir", "//tmp", temp_image_name])
-                with open("/tmp/extracted_img.png") as fi:
-                    new_png = fi.read()
-                text, freq_color = extract_text(new_png, self.args.ocr_resize, self.args.ocr_no_preprocess)
-                if self.save:
-                    with open(save_loc + ".png", "w") as fo:
-                        fo.write(new_png)
-
-        self.result.append({"pic_name": nameData, "sha256": img_hash.hexdigest(), "ocr_text": text, "freq_color": freq_color,
-                            "suspious words": "enable content" in text.lower() or "enable editing" in text.lower(),
-                            "pic_type": pic_type})
+                self.pending_metafiles.append((result, image_data, self.display_size))
+
+    def copy_blip_result(self, earlier, nameData):
+        result = dict(earlier, pic_name=nameData) # copied again after OCR in case earlier is still waiting for it
+        self.result.append(result)
+        self.uid_copies.append((result, earlier))
+        self.img_info.append(earlier["sha256"])
+        if self.store:
+            self.stored.append((earlier["sha256"], earlier["pic_type"], decode_pic_name(nameData)))
+        self.stats.count("uid.hits")
+
+    def decompress_blip(self, compressed, img_hash, recType):
+        '''
+        Streams the inflated metafile into the hash, a temp file in the image store (committed once the hash
+        is known) and, if it is going to LibreOffice, a temp file for the converter. Returns
+        (spooled metafile or None, temp save path or None).
+        '''
+        import tempfile # only needed here, kept off the import path like the OCR modules
+        sinks = [self.budget.decompress_sink(len(compressed)), self.stats.timed("hash", img_hash.update)]
+        spool = None
+        save_file = None
+        if self.store:
+            save_file = self.store.temp_file()
+            sinks.append(self.stats.timed("save", save_file.write))
+        if self.ocr and load_ocr() and libreoffice_available() and (recType == 0xf01a or recType == 0xf01b):
+            spool = tempfile.TemporaryFile()
+            sinks.append(self.stats.timed("spool", spool.write))
+
+        try:
+            with self.stats.stage("decompress", len(compressed)):
+                stream_decompress(compressed, sinks, self.args.max_decompressed_size * 1024 * 1024)
+        except:
+            if save_file:
+                save_file.close()
+                os.remove(save_file.name)
+            if spool:
+                spool.close()
+            raise
+
+        if save_file:
+            save_file.close()
+        return spool, save_file.name if save_file else None
+
+    def set_ocr_result(self, result, text, freq_color):
+        result["ocr_text"] = text
+        result["freq_color"] = freq_color
+        result["suspious words"] = "enable content" in text.lower() or "enable editing" in text.lower()
+
+    def queue_ocr(self, result, image_data, display_size=None):
+        job = self.ocr_pool.submit(extract_text, image_data, self.args.ocr_resize, self.args.ocr_no_preprocess,
+                                   self.args.ocr_preprocess, self.args.ocr_backend, self.stats, display_size,
+                                   self.args.ocr_tiles, self.args.ocr_tile_size * 1024 * 1024)
+        self.pending_ocr.append((result, job, ocr_settings_key(self.args, display_size)))
+
+    def ocr_or_reuse(self, result, image_data, display_size=None):
+        '''
+        With --near-dup-index, an image within --near-dup-radius bits of one OCR'd before gets its results
+        instead of going to OCR, result["near_duplicate"] says which image they came from
+        '''
+        if self.near_dups:
+            import perceptual_hash
+            try:
+                with self.stats.stage("dhash", len(image_data)):
+                    value = perceptual_hash.dhash(image_data)
+            except (IOError, ValueError):
+                value = None # not an image Pillow can open, OCR will fail on it as well
+            if value is not None:
+                result["dhash"] = "{:016x}".format(value)
+                with self.stats.stage("near_dup"):
+                    match = self.near_dups.get(value, ocr_settings_key(self.args, display_size), self.args.near_dup_radius,
+                                               result["sha256"])
+                if match:
+                    sha256, distance, text, freq_color = match
+                    self.set_ocr_result(result, text, freq_color)
+                    result["near_duplicate"] = {"sha256": sha256, "distance": distance}
+                    self.stats.count("near_dup_hits")
+                    return
+        if not self.budget.take_ocr():
+            self.truncate("ocr_images") # the rest of the document is still hashed and saved
+            return
+        self.budget.check_time()
+        self.queue_ocr(result, image_data, display_size)
+
+    def collect_ocr(self):
+        '''
+        Waits for the OCR jobs in the order the images were found, the cache is only used from this thread.
+        Raises BudgetExceeded if they aren't done in the time left.
+        '''
+        if not self.pending_ocr:
+            return
+        for i, (result, job, settings) in enumerate(self.pending_ocr):
+            try:
+                with self.stats.stage("ocr_wait"):
+                    text, freq_color = job.get(self.budget.remaining())
+            except ocr_engine.TimeoutError:
+                self.pending_ocr = self.pending_ocr[i:]
+                raise BudgetExceeded("seconds")
+            self.set_ocr_result(result, text, freq_color)
+            if self.ocr_cache:
+                with self.stats.stage("ocr_cache"):
+                    self.ocr_cache.put(result["sha256"], settings, result["ocr_text"], result["freq_color"])
+            if self.near_dups and "dhash" in result:
+                with self.stats.stage("near_dup"):
+                    self.near_dups.put(result["sha256"], settings, int(result["dhash"], 16),
+                                       result["ocr_text"], result["freq_color"])
+        self.pending_ocr = []
+
+    def convert_pending_metafiles(self):
+        '''
+        All EMF/WMF in the document go to LibreOffice in one job, then get OCR'd like the other images
+        '''
+        if not self.pending_metafiles:
+            return
+
+        import metafile_converter
+        self.budget.check_time()
+        converter = metafile_converter.get_converter(self.args.converter_pool)
+        with self.stats.stage("convert"):
+            pngs = converter.convert([(result["pic_type"], image_data) for result, image_data, _ in self.pending_metafiles])
+        for _, image_data, _ in self.pending_metafiles:
+            if hasattr(image_data, "close"): # spooled by decompress_blip
+                image_data.close()
+        for (result, _, display_size), new_png in zip(self.pending_metafiles, pngs):
+            if new_png is None:
+                continue
+            self.ocr_or_reuse(result, new_png, display_size)
+            if self.store:
+                with self.stats.stage("save", len(new_png)):
+                    self.store.put(result["sha256"], new_png, ".png")
+        self.pending_metafiles = []
 
 
     def parse_OfficeArtMetafileHeader(self):
@@ -328,14 +900,9 @@ class extract_and_hash_image():
             1 byte compression, 0x00 = DEFLATE, 0xFE = No compression
             1 byte filter, must be 0xFE
         '''
-        cbsize = self.read_dword()
-        rcBounds = self.read_bytes(16)
-        ptSize = self.read_bytes(8)
-        cbSave = self.read_dword()
-        compression = self.read_byte()
-        filter_byte = self.read_byte()
+        header = self.read_record(records.OfficeArtMetafileHeader)
 
-        return cbSave, compression
+        return header.cbSave, header.compression, header.cbSize
 
 
 
@@ -346,20 +913,23 @@ class extract_and_hash_image():
             optional 16 byte rgbUid2
             34 byte OfficeArtMetafileHeader struct
             EMF, WMF, PICT data
+        Returns the data and where it is in the stream
         '''
         
         recLen -= 50
         rgbUid1 = self.read_bytes(16)
         if recInstance == 0x217 or recInstance == 0x3d5 or recInstance == 0x543:
-            rgbUid2 = self.read_bytes(6)
+            rgbUid2 = self.read_bytes(16)
             recLen -= 16
             
         
-        cbSave, compression = self.parse_OfficeArtMetafileHeader()
+        cbSave, compression, cbsize = self.parse_OfficeArtMetafileHeader()
         
+        blip = {"offset": self.index, "length": cbSave, "compressed": compression == 0x00, "uncompressed_size": cbsize,
+                "rgbUid": binascii.hexlify(bytes(rgbUid1)).decode("ascii")}
         picData = self.read_bytes(cbSave)
     
-        return picData, compression == 0x00
+        return picData, blip
         
     
     
@@ -370,6 +940,7 @@ class extract_and_hash_image():
             optional 16 byte rgbUid2
             1 byte tag
             PNG, JPEG, DIB, TIFF data
+        Returns the data and where it is in the stream
         '''
         
         recLen -= 17 # recLen includes bytes and rgbUid1, need to remove these from the count
@@ -381,9 +952,11 @@ class extract_and_hash_image():
         
         tag = self.read_byte()
         
+        blip = {"offset": self.index, "length": recLen, "compressed": False, "uncompressed_size": recLen,
+                "rgbUid": binascii.hexlify(bytes(rgbUid1)).decode("ascii")}
         BLIPFileData = self.read_bytes(recLen)
     
-        return BLIPFileData
+        return BLIPFileData, blip
         
     
     
@@ -394,15 +967,16 @@ class extract_and_hash_image():
             return ""
     
         # parse mfpf struct
-        mfpf_mm, _, _, _ = self.parse_mfpf()
+        mfpf_mm = self.parse_mfpf().mm
         if mfpf_mm != 0x64 and mfpf_mm != 0x66: # must be 64 MM_SHAPE or 66_SHAPEFILE
             return "" # should I return more?
     
         # parse innerHeader
-        _, _ = self.parse_innerHeader()
+        self.parse_innerHeader()
 
         # parse picmid struct
-        dxaGoal, dyaGoal, mx, my, bpp = self.parse_picmid() # , above_Brc80, left_Brc80, below_Brc80, right_Brc80 
+        picmid = self.parse_picmid()
+        self.display_size = picmid_display_size(picmid)
 
         cProps = self.read_word()
         if cProps != 0:
@@ -458,13 +1032,114 @@ class extract_and_hash_image():
         return "" # did not hit image data
 
 
-def extract_text(image_data, resize, no_preprocess):
-    img = Image.open(io.BytesIO(image_data))
-    if resize > 0:
-        img = img.resize((img.width * resize, img.height * resize))  # , resample=Image.BOX)
+def extract_blip(stream, blip, max_size=256 * 1024 * 1024):
+    '''
+    Returns the image data for one entry from extract_and_hash_image.Index(), decompressed if needed.
+    Uncompressed data is a view into stream. A compressed metafile is inflated with stream_decompress,
+    raises DecompressionLimitExceeded past max_size bytes (--max-decompressed-size), 0 means no limit.
+    '''
+    image_data = buffer_view(stream, blip["offset"], blip["length"])
+    if blip["compressed"]:
+        out = io.BytesIO()
+        stream_decompress(image_data, [out.write], max_size)
+        image_data = out.getvalue()
+    return image_data
+
+
+def ocr_settings_key(args, display_size=None):
+    '''
+    Every option that changes what extract_text returns has to be part of the OCR cache key. With
+    --ocr-resize auto the scale comes from the image and the size it is shown at, the image is the
+    sha256, so the display size goes in the key as well.
+    '''
+    key = "resize={};no_preprocess={};preprocess={}".format(args.ocr_resize, int(args.ocr_no_preprocess),
+                                                            args.ocr_preprocess)
+    if args.ocr_tiles > 1:
+        key += ";tiles={}".format(args.ocr_tiles) # only when on, so keys from before tiling still match
+    if args.ocr_resize == "auto":
+        key += ";display={}".format("{:.2f}x{:.2f}".format(*display_size) if display_size else "none")
+    return key
+
+
+def picmid_display_size(picmid):
+    '''
+    (width, height) in inches the picture is shown at, dxaGoal and dyaGoal are twips and mx and my
+    per mille scaling. None if the picmid doesn't say.
+    '''
+    if picmid.dxaGoal <= 0 or picmid.dyaGoal <= 0 or not picmid.mx or not picmid.my:
+        return None
+    return picmid.dxaGoal * picmid.mx / 1440000.0, picmid.dyaGoal * picmid.my / 1440000.0
+
+
+def ocr_scale(width, height, display_size=None, dpi=None):
+    '''
+    Scale that brings text in the image to at least about OCR_TEXT_PIXELS high for tesseract. The text
+    is taken to be OCR_TEXT_POINTS at the resolution the picture is shown at in the document, from
+    display_size, or else from the dpi stored in the image, or else a screen's. Small icons come out
+    scaled up, big screenshots as they are or scaled down.
+    '''
+    if display_size:
+        dpi = (width / display_size[0] + height / display_size[1]) / 2
+    elif dpi and dpi[0] > 0:
+        dpi = float(dpi[0])
+    else:
+        dpi = SCREEN_DPI
+    scale = OCR_TEXT_PIXELS / (OCR_TEXT_POINTS / 72.0 * dpi)
+    scale = min(max(scale, OCR_MIN_SCALE), OCR_MAX_SCALE, (OCR_MAX_PIXELS / float(width * height)) ** 0.5)
+    if abs(scale - 1) < 0.25:
+        return 1 # not worth resampling for
+    return scale
+
+
+def ocr_resize_arg(value):
+    return value if value == "auto" else int(value)
+
+
+def ocr_strip(img, backend, stats):
+    with stats.stage("ocr"):
+        return ocr_engine.image_to_string(img, backend)
+
+
+def extract_text(image_data, resize, no_preprocess, preprocess="sample", backend="auto", stats=None, display_size=None,
+                 tiles=0, tile_pixels=0):
+    '''
+    resize is a whole number to multiply the size by, 0 to leave it, or "auto" for ocr_scale. With tiles
+    over 1, an image of at least tile_pixels is OCR'd in that many overlapping strips at the same time.
+    '''
+    load_ocr()
+    if stats is None:
+        stats = pipeline_stats.pipeline_stats()
+    with stats.stage("decode", len(image_data)):
+        img = Image.open(io.BytesIO(image_data))
+        img.load()
+    freq_color = None
+    if resize == "auto":
+        scale = ocr_scale(img.width, img.height, display_size, img.info.get("dpi"))
+        if scale != 1:
+            with stats.stage("resize"):
+                size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+                img = img.resize(size, Image.BICUBIC if scale > 1 else Image.LANCZOS)
+    elif resize > 0:
+        with stats.stage("resize"):
+            img = img.resize((img.width * resize, img.height * resize))  # , resample=Image.BOX)
     if not no_preprocess:
-        img, freq_color = img_convert_n_colors(2, img)  # TODO should probably move to own module
-    return pytesseract.image_to_string(img), freq_color  # TODO use unidecode
+        with stats.stage("preprocess"):
+            if preprocess == "kmeans":
+                img, freq_color = img_convert_n_colors(2, img)
+            else:
+                img, freq_color = img_preprocess.binarize(img, preprocess, 2)
+    strips = [(0, img.height)]
+    if tiles > 1 and img.width * img.height >= tile_pixels:
+        strips = ocr_engine.split_strips(img.height, tiles)
+    if len(strips) > 1:
+        with stats.stage("ocr_tiles"):
+            pool = ocr_engine.get_tile_pool(tiles)
+            jobs = [pool.submit(ocr_strip, img.crop((0, top, img.width, bottom)), backend, stats) for top, bottom in strips]
+            text = ocr_engine.merge_strip_texts([job.get() for job in jobs])
+        stats.count("ocr_tiled")
+    else:
+        text = ocr_strip(img, backend, stats)
+    return text, freq_color  # TODO use unidecode
 
 
 def img_convert_n_colors(num_colors, img):
@@ -472,6 +1147,7 @@ def img_convert_n_colors(num_colors, img):
        Code slightly modified from Peter Hansen's answer on StackOverflow
        https://stackoverflow.com/questions/3241929/python-find-dominant-most-common-color-in-an-image
     '''
+    load_ocr()
     ar = np.asarray(img)
     shape = ar.shape
     ar = ar.reshape(scipy.product(shape[:2]), shape[2]).astype(float)
@@ -489,23 +1165,330 @@ def img_convert_n_colors(num_colors, img):
     return Image.fromarray(c.reshape(*shape).astype(np.uint8)), (peak, colour)
     
 
+def document_name(source, args, name=None):
+    '''
+    The name saved images are recorded under: name if there is one, else source when it is a path. A
+    document passed as data or an open file has no name, with --savefolder it gets "sha256:" and the
+    hash of the document instead, so images aren't all recorded under one empty name.
+    '''
+    if name:
+        return name
+    # the same test olefile uses to tell a path from the document itself
+    if not (hasattr(source, "read") or (isinstance(source, bytes) and len(source) >= olefile.MINIMAL_OLEFILE_SIZE)):
+        return source
+    if not args.savefolder:
+        return ""
+    digest = hashlib.sha256()
+    if hasattr(source, "read"):
+        start = source.tell()
+        for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        source.seek(start)
+    else:
+        digest.update(source)
+    return "sha256:" + digest.hexdigest()
+
+
+def analyze_document(filename, args, stats=None, name=None, seen=None):
+    '''
+    Pass a pipeline_stats to get the stage timings and counters for the document added to it. name is
+    recorded as the source of saved images, by default see document_name. seen is the
+    seen_blips of a batch run, by default --uid-cache only matches BLIPs within the document.
+    Returns a document_images, its truncated is set when a budget ran out before the end of the document.
+    '''
+    if stats is None:
+        stats = pipeline_stats.pipeline_stats()
+    name = document_name(filename, args, name)
+    start = time.time()
+    budget = document_budget(args)
+    with stats.stage("open"):
+        ole = olefile.OleFileIO(filename)
+    try:
+        with stats.stage("read_stream"):
+            data = read_stream_buffer(ole, ['Data'])
+    finally:
+        ole.close()
+    stats.count("documents")
+    stats.count("data_stream_bytes", len(data))
+
+    img_processor = extract_and_hash_image(data, args, stats, name, budget, seen)
+    try:
+        return img_processor.Analyze()
+    finally:
+        stats.wall_seconds += time.time() - start
+
+
+def default_options():
+    '''
+    The command line defaults as an argparse Namespace
+    '''
+    return my_argparser.parse_args([])
+
+
+def extract_images(source, options=None, **kwargs):
+    '''
+    Library entry point. source is a path, the document as bytes or an open file. options is a dict or
+    Namespace of the command line options by their long name with - as _ (savefolder, ocr, ocr_preprocess,
+    ...), keyword arguments override them, anything not given gets the command line default.
+
+    Returns {"images": [one dict per image, as printed by the command line], "stats": per stage timings,
+    "truncated": the budget that ran out, None if the whole document was done}
+    '''
+    args = default_options()
+    if options is not None:
+        kwargs = dict(vars(options) if isinstance(options, argparse.Namespace) else options, **kwargs)
+    for name, value in kwargs.items():
+        if not hasattr(args, name):
+            raise TypeError("unknown option {}".format(name))
+        setattr(args, name, value)
+
+    stats = pipeline_stats.pipeline_stats()
+    images = analyze_document(source, args, stats)
+    return {"images": images, "stats": stats.summary(), "truncated": images.truncated}
+
+
+def decode_pic_name(name):
+    return name.decode("utf-16-le", "replace").rstrip(u"\x00")
+
+
+def result_to_dict(filename, result):
+    '''
+    pic_name is the raw UTF-16 nameData and freq_color holds a numpy array, neither go into JSON as is
+    '''
+    json_result = dict(result)
+    json_result["file"] = filename
+    json_result["pic_name"] = decode_pic_name(result["pic_name"])
+    if result["freq_color"] is not None:
+        peak, colour = result["freq_color"]
+        json_result["freq_color"] = [[int(c) for c in peak], colour]
+    return json_result
+
+
+def result_to_json(filename, result):
+    return json.dumps(result_to_dict(filename, result), sort_keys=True)
+
+
+def results_to_json(filename, results):
+    '''
+    The batch mode lines for a document, one per image and one saying which budget ran out if it was truncated
+    '''
+    lines = [result_to_json(filename, result) for result in results]
+    if results.truncated:
+        lines.append(json.dumps({"file": filename, "truncated": results.truncated}, sort_keys=True))
+    return lines
+
+
+def iter_batch_files(paths, file_list):
+    '''
+    Yields documents from directories (walked recursively), glob patterns, plain paths and a file list
+    with one path per line, "-" reads the list from stdin
+    '''
+    for path in paths or []:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        elif glob.has_magic(path):
+            for match in sorted(glob.glob(path)):
+                if os.path.isfile(match):
+                    yield match
+        else:
+            yield path
+
+    if file_list:
+        fi = sys.stdin if file_list == "-" else open(file_list)
+        try:
+            for line in fi:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if fi is not sys.stdin:
+                fi.close()
+
+
+MANIFEST_TOOL = "extract_img"
+# options that don't change the results of a document, a manifest entry made with other values still holds
+MANIFEST_IGNORED_OPTIONS = ["file", "list", "blip", "batch", "file_list", "jobs", "jsonl", "timeout", "max_tasks_per_child",
+                            "stats", "profile", "ocr_workers", "converter_pool", "ocr_cache", "ocr_cache_size", "uid_cache",
+                            "manifest", "manifest_skip", "manifest_hash"]
+
+
+def manifest_config(args):
+    import scan_manifest
+    return scan_manifest.config_version(dict((name, value) for name, value in vars(args).items()
+                                             if name not in MANIFEST_IGNORED_OPTIONS))
+
+
+def analyze_with_manifest(filename, stats):
+    '''
+    Returns the JSON lines for a document in batch mode, replayed from --manifest when it is unchanged.
+    A document cut short by --max-seconds isn't recorded, it may get further on a quieter night.
+    '''
+    import scan_manifest
+    manifest = scan_manifest.open_manifest(batch_args.manifest)
+    with stats.stage("manifest"):
+        entry = manifest.check(MANIFEST_TOOL, filename, __version__, batch_config, batch_args.manifest_hash)
+    if entry.output is not None:
+        stats.count("manifest.same_" + entry.matched)
+        if batch_args.manifest_skip:
+            return []
+        # a document matched by sha256 may have been recorded under another path
+        return [json.dumps(dict(json.loads(line), file=filename), sort_keys=True) for line in entry.output.splitlines()]
+
+    stats.count("manifest.changed")
+    results = analyze_document(filename, batch_args, stats, seen=batch_seen)
+    lines = results_to_json(filename, results)
+    if results.truncated != "seconds":
+        with stats.stage("manifest"):
+            manifest.record(entry, "\n".join(lines))
+    return lines
+
+
+class DocumentTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise DocumentTimeout("document took longer than the batch timeout")
+
+
+def _batch_init(args):
+    global batch_args, batch_config, batch_seen
+    batch_args = args
+    batch_config = manifest_config(args) if args.manifest else None
+    batch_seen = seen_blips(args.uid_cache) if args.uid_cache > 0 else None # shared by this worker's documents
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # let the parent handle ctrl-c and terminate the pool
+    signal.signal(signal.SIGALRM, _raise_timeout)
+
+
+def _batch_worker(filename):
+    '''
+    Runs in the pool, returns the JSON lines so serializing is spread over the workers as well.
+    Any failure is returned as an error line, a bad document must not take the worker down with it.
+    With --stats the document's summary is returned too, as a line and for the parent to total up.
+    '''
+    stats = pipeline_stats.pipeline_stats()
+    signal.alarm(batch_args.timeout)
+    try:
+        if batch_args.manifest:
+            lines = analyze_with_manifest(filename, stats)
+        else:
+            lines = results_to_json(filename, analyze_document(filename, batch_args, stats, seen=batch_seen))
+    except Exception as e:
+        stats.count("errors")
+        lines = [json.dumps({"file": filename, "error": "{}: {}".format(type(e).__name__, e)}, sort_keys=True)]
+    finally:
+        signal.alarm(0)
+
+    if not batch_args.stats:
+        return lines, None
+    summary = stats.summary()
+    lines.append(json.dumps({"file": filename, "stats": summary}, sort_keys=True))
+    return lines, summary
+
+
+def run_batch(args):
+    files = iter_batch_files(args.batch, args.file_list)
+    fo = open(args.jsonl, "w") if args.jsonl else sys.stdout
+    import multiprocessing
+    pool = multiprocessing.Pool(args.jobs or None, _batch_init, (args,), maxtasksperchild=args.max_tasks_per_child or None)
+    totals = pipeline_stats.pipeline_stats()
+    try:
+        # chunksize 1, documents vary too much in size to hand them out in groups
+        for lines, summary in pool.imap_unordered(_batch_worker, files, 1):
+            for line in lines:
+                fo.write(line + "\n")
+            fo.flush()
+            if summary:
+                totals.merge(summary)
+        pool.close()
+        if args.stats:
+            # stderr, so the totals don't end up mixed in with the results
+            sys.stderr.write(json.dumps({"batch_stats": totals.summary()}, sort_keys=True) + "\n")
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        if fo is not sys.stdout:
+            fo.close()
+
+
 my_argparser = argparse.ArgumentParser()
-my_argparser.add_argument("-s", "--savefolder", type=str, help="Folder to save images to", default="")
+my_argparser.add_argument("-s", "--savefolder", type=str, help="Folder to save images to, sharded by sha256, see image_store.py", default="")
 my_argparser.add_argument("-f", "--file", type=str, help="Document to extract files from")
 my_argparser.add_argument("-o", "--ocr", action='store_true', help="Run OCR on image", default=False)
 my_argparser.add_argument("--ocr-no-preprocess", action='store_true', help="Do not run preprocessing on image", default=False)
-my_argparser.add_argument("--ocr-resize", type=int, help="Resize image to X before preprocessing, 0 means don't resize", default=2)
-
+my_argparser.add_argument("--ocr-resize", type=ocr_resize_arg, help="Multiply image size by X before preprocessing, 0 means don't resize, auto picks a scale from the size the image is shown at, not yet checked for accuracy against 2", default=2)
+my_argparser.add_argument("--ocr-preprocess", type=str, help="Engine used to reduce the image to 2 colors, kmeans is the original full image k-means",
+                          default="sample", choices=["sample", "otsu", "kmeans"])
+my_argparser.add_argument("--ocr-workers", type=int, help="Number of images to OCR at the same time", default=1)
+my_argparser.add_argument("--ocr-tiles", type=int, help="OCR images over --ocr-tile-size in this many overlapping strips at the same time, 0 means never", default=0)
+my_argparser.add_argument("--ocr-tile-size", type=int, help="Images of at least X Mpixels, after resizing, are OCR'd in strips", default=4)
+my_argparser.add_argument("--ocr-backend", type=str, help="tesserocr keeps a tesseract engine per worker, pytesseract starts tesseract per image",
+                          default="auto", choices=["auto", "tesserocr", "pytesseract"])
+my_argparser.add_argument("--ocr-cache", type=str, help="SQLite file to cache OCR results in, keyed by image sha256", default="")
+my_argparser.add_argument("--ocr-cache-size", type=int, help="Evict least recently used OCR results once the cache is over X MB, 0 means no limit", default=512)
+my_argparser.add_argument("--near-dup-index", type=str, help="SQLite file of image dHashes, images close to one OCR'd before reuse its OCR results", default="")
+my_argparser.add_argument("--near-dup-radius", type=int, help="Most dHash bits that can differ for an image to count as a near duplicate", default=6)
+my_argparser.add_argument("--uid-cache", type=int, help="Remember the results of this many BLIPs by their rgbUid, a BLIP with a uid seen before in the document or batch run copies the result, 0 turns it off", default=0)
+my_argparser.add_argument("--uid-verify-rate", type=float, help="Fraction of rgbUid matches processed anyway and checked against the sha256, to catch spoofed uids", default=0.01)
+my_argparser.add_argument("--converter-pool", type=int, help="Number of LibreOffice processes kept running to convert EMF/WMF for OCR. Only fast with the python UNO bindings, without them every document with EMF/WMF still starts soffice once, which takes seconds", default=1)
+my_argparser.add_argument("--max-decompressed-size", type=int, help="Give up on a compressed metafile once it inflates past X MB, 0 means no limit", default=256)
+my_argparser.add_argument("--max-seconds", type=float, help="Stop a document after X seconds and return what was found so far, flagged truncated, 0 means no limit", default=0)
+my_argparser.add_argument("--max-records", type=int, help="Stop a document after walking X records, 0 means no limit", default=0)
+my_argparser.add_argument("--max-total-decompressed", type=int, help="Stop a document once its metafiles inflate past X MB in total, 0 means no limit", default=1024)
+my_argparser.add_argument("--max-compression-ratio", type=int, help="Stop a document at a metafile that inflates past X times its compressed size, 0 means no limit", default=0)
+my_argparser.add_argument("--max-ocr-images", type=int, help="OCR at most X images of a document, the rest are still hashed and saved, 0 means no limit", default=0)
+my_argparser.add_argument("-l", "--list", action='store_true', help="Only list where the BLIPs are, without reading the image data", default=False)
+my_argparser.add_argument("--blip", type=int, help="Extract the BLIP at this offset from --list, saved to --savefolder", default=-1)
+my_argparser.add_argument("-b", "--batch", type=str, nargs="+", metavar="PATH", help="Directories, globs or documents to process in batch mode")
+my_argparser.add_argument("--file-list", type=str, help="File with one document per line to process in batch mode, - for stdin")
+my_argparser.add_argument("-j", "--jobs", type=int, help="Number of worker processes in batch mode, 0 means one per core", default=0)
+my_argparser.add_argument("--jsonl", type=str, help="Write batch results to this file instead of stdout", default="")
+my_argparser.add_argument("--timeout", type=int, help="Seconds before a document is given up on in batch mode, 0 means no limit", default=300)
+my_argparser.add_argument("--max-tasks-per-child", type=int, help="Restart batch workers after this many documents, 0 means never", default=0)
+my_argparser.add_argument("--manifest", type=str, help="SQLite file of the documents scanned before, batch mode replays the results of unchanged ones", default="")
+my_argparser.add_argument("--manifest-skip", action='store_true', help="Leave documents unchanged since the manifest out of the output instead of replaying them", default=False)
+my_argparser.add_argument("--manifest-hash", action='store_true', help="Hash every document instead of trusting an unchanged size and mtime", default=False)
+my_argparser.add_argument("--stats", action='store_true', help="Print time spent and bytes processed per stage, and images per type", default=False)
+my_argparser.add_argument("--profile", type=str, help="Run the record walk under cProfile and write the stats to this file, batch workers add their pid", default="")
 
-args = my_argparser.parse_args()
 
-if args.ocr and not ENABLE_OCR:
-    print("OCR requires pytesseract and Pillow")
+if __name__ == "__main__":
+    args = my_argparser.parse_args()
 
-ole = olefile.OleFileIO(args.file)
-with ole.openstream(['Data']) as data_stream:
-    data = data_stream.read()
+    if args.ocr and not load_ocr():
+        print("OCR requires pytesseract and Pillow")
 
-img_processor = extract_and_hash_image(data, args)
-print(img_processor.Analyze())
+    if args.batch or args.file_list:
+        run_batch(args)
+    elif args.list or args.blip >= 0:
+        ole = olefile.OleFileIO(args.file)
+        data = read_stream_buffer(ole, ['Data'])
+        ole.close()
+        blips = extract_and_hash_image(data, args, document=args.file).Index()
+        if args.list:
+            print(blips)
+        for blip in blips:
+            if blip["offset"] == args.blip:
+                try:
+                    image_data = extract_blip(data, blip, args.max_decompressed_size * 1024 * 1024)
+                except (DecompressionLimitExceeded, zlib.error) as e:
+                    print({"error": str(e), "pic_type": blip["pic_type"], "pic_name": blip["pic_name"]})
+                    continue
+                sha256 = hashlib.sha256(image_data).hexdigest()
+                if args.savefolder:
+                    import image_store
+                    image_store.open_store(args.savefolder).put(sha256, image_data)
+                print({"sha256": sha256, "pic_type": blip["pic_type"], "pic_name": blip["pic_name"]})
+    else:
+        stats = pipeline_stats.pipeline_stats()
+        images = analyze_document(args.file, args, stats)
+        print(images)
+        if images.truncated:
+            print({"truncated": images.truncated})
+        if args.stats:
+            print(stats.summary())
 
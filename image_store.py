@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+__description__ = 'Sharded content addressed store for the images extract_img.py saves'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Images are saved as <root>/<sha256[0:2]>/<sha256[2:4]>/<sha256>, converted metafiles get .png added, so
+no directory ends up with more than a few hundred entries even with millions of images. An image that
+is already there isn't written again. New ones are written in binary to <root>/.partial and renamed
+into place, so a reader, or another batch worker saving the same image, never sees half a file.
+
+index.sqlite next to the shards has the pic_type and pic_name of every image and the documents it was
+found in, written once per document. A document passed as data is recorded as sha256:<its sha256>.
+
+Usage:
+$ python extract_img.py -f ../test_docs/image_in_doc.doc -s test
+$ ls test/57/37/
+5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf
+
+$ python image_store.py test --sources 5737761889ed2d709d00a65d84cfe4dee120c8c2d98054e5fff073652021aaaf
+{'pic_type': u'jpeg', 'pic_name': u'image1.jpeg', 'documents': [u'../test_docs/image_in_doc.doc']}
+
+Folders saved to before, with every image in the top level, are moved into the shards with
+$ python image_store.py test --migrate
+
+History:
+  2026/10/18: start
+  2026/10/18: record refuses an empty document name
+"""
+
+import argparse
+import errno
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+FANOUT_LEVELS = 2
+FANOUT_WIDTH = 2 # hex digits per level, 256 directories each
+
+INDEX_NAME = "index.sqlite"
+PARTIAL_DIR = ".partial"
+IMAGE_NAME = re.compile(r"^[0-9a-f]{64}(\.png)?$")
+
+# one statement each, execute() prepares again when another batch worker creates the tables first,
+# executescript() fails with "database schema has changed"
+SCHEMA = ['''
+CREATE TABLE IF NOT EXISTS images (
+    sha256 TEXT PRIMARY KEY,
+    pic_type TEXT NOT NULL,
+    pic_name TEXT NOT NULL,
+    first_seen REAL NOT NULL
+)''', '''
+CREATE TABLE IF NOT EXISTS sources (
+    sha256 TEXT NOT NULL,
+    document TEXT NOT NULL,
+    PRIMARY KEY (sha256, document)
+)''']
+
+_open_stores = {}
+
+
+def open_store(root):
+    '''
+    Returns one store per root for this process, like ocr_cache.open_cache
+    '''
+    key = (os.getpid(), root)
+    if key not in _open_stores:
+        _open_stores[key] = image_store(root)
+    return _open_stores[key]
+
+
+def makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST: # another batch worker made it first
+            raise
+
+
+class image_store():
+
+    def __init__(self, root):
+        self.root = root
+        self.partial = os.path.join(root, PARTIAL_DIR)
+        self.made_dirs = set()
+        makedirs(self.partial)
+
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(os.path.join(root, INDEX_NAME), timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def path(self, sha256, suffix=""):
+        shards = [sha256[i * FANOUT_WIDTH:(i + 1) * FANOUT_WIDTH] for i in range(FANOUT_LEVELS)]
+        return os.path.join(self.root, *(shards + [sha256 + suffix]))
+
+    def contains(self, sha256, suffix=""):
+        return os.path.exists(self.path(sha256, suffix))
+
+    def temp_file(self):
+        '''
+        Binary file to stream an image into before its hash is known, hand it to commit() once it is
+        '''
+        return tempfile.NamedTemporaryFile(dir=self.partial, prefix="img_", delete=False)
+
+    def commit(self, temp_path, sha256, suffix=""):
+        '''
+        Renames temp_path into place, or removes it if the image is there already. Returns True if it was new.
+        '''
+        path = self.path(sha256, suffix)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            return False
+        directory = os.path.dirname(path)
+        if directory not in self.made_dirs:
+            makedirs(directory)
+            self.made_dirs.add(directory)
+        os.rename(temp_path, path)
+        return True
+
+    def put(self, sha256, data, suffix=""):
+        '''
+        Saves data unless the image is there already, returns True if it was written
+        '''
+        if self.contains(sha256, suffix):
+            return False
+        with self.temp_file() as fo:
+            fo.write(data)
+        return self.commit(fo.name, sha256, suffix)
+
+    def record(self, images, document):
+        '''
+        images is a list of (sha256, pic_type, pic_name), all added in one transaction. document can't be empty,
+        see extract_img.document_name
+        '''
+        if not images:
+            return
+        if not document:
+            raise ValueError("images need the document they came from")
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR IGNORE INTO images VALUES (?, ?, ?, ?)",
+                                [(sha256, pic_type, pic_name, now) for sha256, pic_type, pic_name in images])
+            self.db.executemany("INSERT OR IGNORE INTO sources VALUES (?, ?)",
+                                [(sha256, document) for sha256, _, _ in images])
+
+    def sources(self, sha256):
+        '''
+        Returns {"pic_type", "pic_name", "documents"} for an image, or None if it was never recorded
+        '''
+        with self.lock:
+            row = self.db.execute("SELECT pic_type, pic_name FROM images WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is None:
+                return None
+            documents = [doc for doc, in self.db.execute("SELECT document FROM sources WHERE sha256 = ? ORDER BY document",
+                                                         (sha256,))]
+        return {"pic_type": row[0], "pic_name": row[1], "documents": documents}
+
+    def migrate(self):
+        '''
+        Moves images saved flat in the root into their shards, returns how many were moved
+        '''
+        moved = 0
+        for name in os.listdir(self.root):
+            if not IMAGE_NAME.match(name):
+                continue
+            sha256, suffix = name[:64], name[64:]
+            if self.commit(os.path.join(self.root, name), sha256, suffix):
+                moved += 1
+        return moved
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("root", type=str, help="Folder images were saved to with extract_img.py -s")
+    my_argparser.add_argument("--sources", type=str, metavar="SHA256", help="Print the type, name and documents of an image")
+    my_argparser.add_argument("--migrate", action='store_true', help="Move images saved flat in the folder into the shards", default=False)
+
+    args = my_argparser.parse_args()
+
+    store = image_store(args.root)
+    if args.migrate:
+        print("moved {} images".format(store.migrate()))
+    if args.sources:
+        print(store.sources(args.sources))
+    store.close()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+__description__ = 'Reduce images to a few colors before OCR, vectorized replacements for img_convert_n_colors'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+img_convert_n_colors in extract_img.py runs k-means over every pixel as float64 and then rebuilds the
+image one code at a time, on big screenshots that is slower than tesseract. Both engines here work
+on the uint8 pixels and map the palette onto the whole image with one lookup.
+
+    sample - k-means fit on a strided sample of at most sample_size pixels, every pixel is then
+             assigned to the closest code, in blocks so the distance array stays small
+    otsu   - Otsu threshold on the grayscale histogram, each side is painted with its mean color
+
+Both return the same (image, (peak, colour)) as img_convert_n_colors, where peak is the most common
+color and colour is its hex string.
+
+History:
+  2026/10/18: start
+"""
+
+import binascii
+
+import numpy as np
+import scipy.cluster.vq
+from PIL import Image
+
+SAMPLE_SIZE = 16384
+KMEANS_RUNS = 4 # scipy's default is 20 restarts, the sample is clean enough that a few are plenty
+BLOCK_PIXELS = 1 << 20 # pixels per block when assigning codes, keeps the int32 distances around 4 MB per code
+
+
+def to_rgb_array(img):
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img, dtype=np.uint8)
+
+
+def freq_color(codes, counts):
+    peak = codes[np.argmax(counts)]
+    colour = binascii.hexlify(bytearray(int(c) for c in peak)).decode('ascii')
+    return peak, colour
+
+
+def assign_codes(pixels, codes):
+    '''
+    pixels is (n, 3) uint8, codes is (k, 3), returns the index of the closest code for every pixel
+    '''
+    codes = np.round(codes).astype(np.int32)
+    labels = np.empty(len(pixels), dtype=np.uint8)
+    for start in range(0, len(pixels), BLOCK_PIXELS):
+        block = pixels[start:start + BLOCK_PIXELS].astype(np.int32)
+        dist = np.empty((len(codes), len(block)), dtype=np.int32)
+        for i, code in enumerate(codes):
+            diff = block - code
+            dist[i] = (diff * diff).sum(axis=1)
+        labels[start:start + BLOCK_PIXELS] = dist.argmin(axis=0)
+    return labels
+
+
+def sample_kmeans(img, num_colors=2, sample_size=SAMPLE_SIZE):
+    ar = to_rgb_array(img)
+    shape = ar.shape
+    pixels = ar.reshape(-1, 3)
+
+    step = max(1, len(pixels) // sample_size)
+    sample = pixels[::step].astype(np.float32)
+    codes, _ = scipy.cluster.vq.kmeans(sample, num_colors, KMEANS_RUNS)
+
+    labels = assign_codes(pixels, codes)
+    counts = np.bincount(labels, minlength=len(codes))
+    palette = np.round(codes).clip(0, 255).astype(np.uint8)
+    return Image.fromarray(palette[labels].reshape(shape)), freq_color(codes, counts)
+
+
+def otsu_threshold(hist):
+    '''
+    Threshold t maximising the between class variance, pixels <= t are one class
+    '''
+    total = hist.sum()
+    levels = np.arange(len(hist), dtype=np.float64)
+    weight0 = np.cumsum(hist).astype(np.float64)
+    weight1 = total - weight0
+    sum0 = np.cumsum(hist * levels)
+    mean0 = sum0 / np.maximum(weight0, 1)
+    mean1 = (sum0[-1] - sum0) / np.maximum(weight1, 1)
+    between = weight0 * weight1 * (mean0 - mean1) ** 2
+    return int(np.argmax(between))
+
+
+def otsu(img, num_colors=2):
+    '''
+    Always splits into two colors, num_colors is only there to match the other engines
+    '''
+    ar = to_rgb_array(img)
+    shape = ar.shape
+    pixels = ar.reshape(-1, 3)
+
+    # ITU-R 601 luma, same weights as PIL's convert("L")
+    wide = pixels.astype(np.uint32)
+    gray = (wide[:, 0] * 299 + wide[:, 1] * 587 + wide[:, 2] * 114) // 1000
+    hist = np.bincount(gray, minlength=256)
+    labels = (gray > otsu_threshold(hist)).astype(np.uint8)
+
+    counts = np.bincount(labels, minlength=2)
+    codes = np.zeros((2, 3))
+    for channel in range(3):
+        codes[:, channel] = np.bincount(labels, weights=pixels[:, channel], minlength=2) / np.maximum(counts, 1)
+    palette = np.round(codes).astype(np.uint8)
+    return Image.fromarray(palette[labels].reshape(shape)), freq_color(codes, counts)
+
+
+ENGINES = {"sample": sample_kmeans, "otsu": otsu}
+
+
+def binarize(img, method="sample", num_colors=2):
+    return ENGINES[method](img, num_colors)
@@ -2,8 +2,8 @@
 
 __description__ = 'Parse Form Control data using oletools.oleform and print properties in /f for inkedit form controls'
 __author__ = 'Jon Armer'
-__version__ = '0.0.4'
-__date__ = '2020/02/09'
+__version__ = '0.0.6'
+__date__ = '2026/10/18'
 
 """
 
@@ -16,20 +16,38 @@ Usage:
 $ python oleform_patched.py -f ../doc_inkedit/ink_default.doc 
 {'rtf_data': '{\\rtf1\\ansi\\ansicpg1252\\deff0\\nouicompat\\deflang1033{\\fonttbl{\\f0\\fnil MS Sans Serif;}}\r\n{\\*\\generator Riched20 10.0.18362}\\viewkind4\\uc1 \r\n\\pard\\f0\\fs16 InkEdit1\\par\r\n}\r\n', 'height': 1040, 'RecognTimeOut': 2000, 'backColor': '0x80000005', 'fontname': 'MS Sans Serif', 'cbClassTable': 0, 'mouseIcon': None, 'InkInsertMode': '0 - IEM_InsertText', 'width': 3900, 'version': 2, 'PropMask': 0, 'data_size': 505, 'UseMouseForInput': 0, 'factorid': 'DEFAULT', 'Locked': False, 'font_data': '\x01\x00\x00\x00\x90\x01\xf8$\x01\x00\rMS Sans Serif\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00', 'Enabled': -1, 'ScrollBars': '0 - rtfNone', 'apperance': '1 - rtfThreeD', 'disableNoScroll': False, 'InkMode': '2 - IEM_InkAndGesture', 'MultiLine': False, 'MaxLength': 0, 'borderStyle': '1 - rtfFixedSingle', 'MousePointer': '0 - IMP_Default'}
 
+Documents scanned before are replayed from the manifest instead of parsed again, see scan_manifest.py:
+$ python inkedit_parser.py -f ../doc_inkedit/ink_default.doc --manifest ~/.cache/doctools_manifest.sqlite
 
 History:
   2020/02/08: start
   2020/02/12: Added cbClassTable Parser, and put inkedit parsing into class 
+  2026/10/18: Read the fixed size inkedit properties with one unpack, see records.py
+  2026/10/18: Added --manifest, a document scanned before with the same version has its report replayed
+  2026/10/18: Form storages are found in one walk of the directory tree and their streams opened from their entries
+  2026/10/18: Added iter_controls, yields a slotted form_control per control as it is decoded. property_values is per control
+  2026/10/18: Controls are decoded through a registry keyed by ClsidCacheIndex and CLSID, unknown ones skipped by size.
+              oletools is no longer patched at import
+  2026/10/18: InkEdit text comes from rtf_text.py, all of it whatever the font size, with its fonts and control words
+  2026/10/18: Split storage_index out of form_storages, so doc_scanner.py can share the directory walk
+  2026/10/18: A control without an ObjectStreamSize is skipped as size 0, so the controls after it stay aligned
+  2026/10/18: rtf_data has its NULs removed again, as before rtf_text.py
+  2026/10/18: InkEdit properties are looked up by their number, one not in PROPERTY_LIST is unknown instead of an IndexError
+  2026/10/18: A control of size 0 isn't decoded, one that fails to decode is skipped with its error and the form goes on
+  2026/10/18: inkedit_report closes the document when parsing fails
 
 Todo:
     - Make PR into oletools repo
-    - Add option to use actual RTF parser
 """
 
 import olefile
 from oletools.oleform import *
 import argparse
-from pprint import pprint
+from collections import OrderedDict
+from pprint import pformat
+
+import records
+import rtf_text
 
 class inkeditControl():
     PROPERTY_LIST = {"apperance" : ["0 - rtfFlat", "1 - rtfThreeD"], 
@@ -42,49 +60,66 @@ class inkeditControl():
                                        "12 - IMP_ArrowQuestion", "13 - IMP_SizeAll", "14 - IMP_Hand", "99 - IMP_Custom"],
                      "ScrollBars" : ["0 - rtfNone", "1 - rtfHorizontal", "2 - rtfVertical", "3 - rtfBoth"]}
     
-    inkedit_fields = [("version", "<h", 2), ("cbClassTable", "<h", 2), ("PropMask", "<i", 4), ("data_size", "<i", 4), 
-                                         ("unkown_1", "<I", 4, "hex"), ("unkown_2", "<I", 4, "hex"), ("width", "<i", 4), ("height", "<i", 4), 
-                                         ("backColor", "<I", 4, "hex"), ("apperance", "<i", 4, "prop"), ("borderStyle", "<i", 4, "prop"), 
-                                         ("MousePointer", "<i", 4, "prop"), ("InkMode", "<i", 4, "prop"), ("InkInsertMode", "<i", 4, "prop"),
-                                         ("RecognTimeOut", "<i", 4), ("Locked", "<h", 2, "bool"), ("MultiLine", "<h", 2, "bool"), 
-                                         ("disableNoScroll", "<h", 2, "bool"), ("padding", "<bb", 2), ("ScrollBars", "<i", 4, "prop"),
-                                         ("Enabled", "<h", 2, "bool"), ("padding", "<bb", 2), ("MaxLength", "<i", 4), ("UseMouseForInput", "<h", 2, "bool"), 
-                                         ("padding", "<bbbbbb", 6), ("factorid", "<i", 4, "unicode"), ("mouseIcon", "<i", 4, "image"),
-                                         ("font", "<i", 4, "font"), ("rtf_data", "<i", 4, "rtf")]
+    # the fixed size properties are declared in records.InkEditProperties and read with one unpack,
+    # these are the ones that need converting after
+    inkedit_field_types = {"unkown_1": "hex", "unkown_2": "hex", "backColor": "hex",
+                           "apperance": "prop", "borderStyle": "prop", "MousePointer": "prop", "InkMode": "prop",
+                           "InkInsertMode": "prop", "ScrollBars": "prop",
+                           "Locked": "bool", "MultiLine": "bool", "disableNoScroll": "bool", "Enabled": "bool",
+                           "UseMouseForInput": "bool"}
+    # each is a 4 byte length followed by the data, after the factorid data
+    inkedit_variable_fields = [("mouseIcon", "image"), ("font", "font"), ("rtf_data", "rtf")]
     # Note: Padding is likely simliar to that in other MS-OFORMS objects, where data of 4 bytes needs to be align to offsets that are multiple of 4
     # Though it looks like all fields are required here, so having hardcoded padding sizes should be ok 
 
-    property_values = {}
-    
-
     def __init__(self, stream):
-        for field in self.inkedit_fields:
-            field_value = stream.unpack(field[1], field[2])
-            if len(field) == 3:
-                self.property_values[field[0]] = field_value
+        self.property_values = {} # was a class attribute, every control wrote into the same dict
+        fixed = records.InkEditProperties.unpack(stream.read(records.InkEditProperties.size))
+        for name, field_value in zip(fixed._fields, fixed):
+            field_type = self.inkedit_field_types.get(name)
+            if field_type == "bool":
+                self.property_values[name] = field_value > 0
+            elif field_type == "prop":
+                self.property_values[name] = self.property_name(name, field_value)
+            elif field_type == "hex":
+                self.property_values[name] = hex(field_value)
             else:
-                if field[3] == "bool":
-                    self.property_values[field[0]] = field_value > 0
-                if field[3] == "unicode":
-                    unicodedata = stream.read(field_value)
-                    self.property_values[field[0]] = unicodedata.replace("\x00", "")
-                elif field[3] == "prop":
-                    self.property_values[field[0]] = self.PROPERTY_LIST[field[0]][field_value]
-                elif field[3] == "font":
-                    fontdata = stream.read(field_value)
-                    self.property_values["fontdata"] = fontdata
-                    fontname_size = struct.unpack(">h", fontdata[9:11])[0]  # TODO add in font parsing
-                    self.property_values["fontname"] = fontdata[11:11+fontname_size]
-                elif field[3] == "rtf":
-                    self.property_values["rtf_data"] = stream.read(field_value).replace("\x00", "") # remove null chars
-                    beginning_text = self.property_values["rtf_data"].find("\\fs16 ") + 6 # TODO add option to use actual RTF parser
-                    end_text = self.property_values["rtf_data"][beginning_text:].find("\\par")
-                    self.property_values["text"] = self.property_values["rtf_data"][beginning_text:beginning_text + end_text]
-                elif field[3] == "image":
-                    if field_value > 0:
-                        self.property_values[field[0]] = stream.read(field_value)
-                elif field[3] == "hex":
-                    self.property_values[field[0]] = hex(field_value)
+                self.property_values[name] = field_value
+
+        unicodedata = stream.read(fixed.factorid)
+        self.property_values["factorid"] = unicodedata.replace("\x00", "")
+
+        for name, field_type in self.inkedit_variable_fields:
+            field_value = stream.unpack("<i", 4)
+            if field_type == "font":
+                fontdata = stream.read(field_value)
+                self.property_values["fontdata"] = fontdata
+                fontname_size = struct.unpack(">h", fontdata[9:11])[0]  # TODO add in font parsing
+                self.property_values["fontname"] = fontdata[11:11+fontname_size]
+            elif field_type == "rtf":
+                rtf_data = stream.read(field_value)
+                if rtf_data.endswith("\x00"): # NUL terminated, the tokenizer skips any NUL inside
+                    rtf_data = rtf_data.rstrip("\x00")
+                rtf = rtf_text.parse_rtf(rtf_data)
+                self.property_values["rtf_data"] = rtf_data.replace("\x00", "") # remove null chars, UTF-16 RTF is reported like the ANSI one
+                self.property_values["text"] = rtf["text"]
+                self.property_values["rtf_fonts"] = rtf["font_chars"]
+                self.property_values["rtf_sizes"] = rtf["size_chars"]
+                self.property_values["rtf_control_words"] = rtf["control_words"]
+            elif field_type == "image":
+                if field_value > 0:
+                    self.property_values[name] = stream.read(field_value)
+
+    @classmethod
+    def property_name(cls, name, value):
+        '''
+        The PROPERTY_LIST entry for value, found by its number, 99 - IMP_Custom isn't the 99th entry
+        '''
+        prefix = "{} - ".format(value)
+        for entry in cls.PROPERTY_LIST[name]:
+            if entry.startswith(prefix):
+                return entry
+        return prefix + "unknown"
 
 
 
@@ -109,57 +144,307 @@ class ClassInfoPropMask(Mask):
                 self._read_size += size
 
 
-# Functions from oletools.oleform that I patched to handle non-standard form controls;
+class form_stream(ExtendedStream):
+    '''
+    Keeps the class table of the form it is reading, oletools' ExtendedStream doesn't
+    '''
+
+    def __init__(self, stream, path):
+        ExtendedStream.__init__(self, stream, path)
+        self.classTable = []
+
+    def tell(self):
+        return self._pos
+
+    def skip_to(self, pos):
+        '''
+        Moves to pos, back as well if a decoder read past the end of its control
+        '''
+        if pos != self._pos:
+            self._stream.seek(pos)
+            self._pos = pos
+
+
+# ClsidCacheIndex -> decoder, see FormEmbeddedActiveXControlCached [MS-OFORMS] 2.4.5
+CACHED_DECODERS = {}
+# CLSID in the form's class table -> decoder, for the controls with ClsidCacheIndex 0x8000 and up
+CLSID_DECODERS = {}
+
+INKEDIT_CLSID = "\xf5\x59\xca\xe5\xc4\x57\xd8\x4d\x9b\xd6\x1d\xee\xed\xd2\x7a\xf4"
+
+
+def register_decoder(decoder, cache_indexes=(), clsids=()):
+    '''
+    decoder(data, control) reads a control's properties from the o stream into its form_control.
+    It doesn't have to read all of them, the rest is skipped.
+    '''
+    for index in cache_indexes:
+        CACHED_DECODERS[index] = decoder
+    for clsid in clsids:
+        CLSID_DECODERS[clsid] = decoder
+
+
+def find_decoder(ClsidCacheIndex, classTable):
+    if ClsidCacheIndex > 0x7FFF:
+        entry = ClsidCacheIndex - 0x8000
+        return CLSID_DECODERS.get(classTable[entry]) if entry < len(classTable) else None
+    return CACHED_DECODERS.get(ClsidCacheIndex)
+
+
+def consumer(consume):
+    '''
+    Decoder for an oletools consume_ function whose result isn't kept
+    '''
+    return lambda data, var: consume(data)
+
+
+def decode_MorphDataControl(data, var):
+    var.value, var.caption, var.group_name = consume_MorphDataControl(data)
+
+
+def decode_LabelControl(data, var):
+    var.caption = consume_LabelControl(data)
+
+
+def decode_inkedit(data, var):
+    control_data = inkeditControl(data).property_values
+    var.raw_data = control_data
+    var.factorid = control_data['factorid']
+    var.rtf_data = control_data['rtf_data']
+    var.text = control_data['text']
+    var.non_ms_type = "InkEdit"
+
+
+# Frame (7), MultiPage (14) and Form (57) keep their data in a storage of their own, nothing to read in o
+register_decoder(consumer(consume_ImageControl), [12])
+register_decoder(decode_MorphDataControl, [15, 23, 24, 25, 26, 27, 28])
+register_decoder(consumer(consume_SpinButtonControl), [16])
+register_decoder(consumer(consume_CommandButtonControl), [17])
+register_decoder(consumer(consume_TabStripControl), [18])
+register_decoder(decode_LabelControl, [21])
+register_decoder(consumer(consume_ScrollBarControl), [47])
+register_decoder(decode_inkedit, clsids=[INKEDIT_CLSID])
+
+
+class form_control(object):
+    '''
+    One control of a form. __slots__ needs a new style class, a corpus can have millions of these and
+    they don't get a __dict__ each. form is the path of the form's f stream. The fields oletools
+    doesn't always set are None when they weren't decoded and left out of as_dict, ObjectStreamSize is
+    None when the site didn't store it.
+    '''
+    __slots__ = ("form", "name", "tag", "id", "tabindex", "ClsidCacheIndex", "value", "caption", "control_tip_text",
+                 "ObjectStreamSize", "group_name", "non_ms_type", "factorid", "rtf_data", "text", "raw_data", "error")
+    SITE_FIELDS = __slots__[1:9] # always in the dict oletools returns for a site
+    OPTIONAL_FIELDS = __slots__[9:]
+
+    def __init__(self, form, site):
+        self.form = form
+        for name in self.SITE_FIELDS:
+            setattr(self, name, site[name])
+        for name in self.OPTIONAL_FIELDS:
+            setattr(self, name, None)
+        self.ObjectStreamSize = site['ObjectStreamSize']
+
+    def as_dict(self):
+        '''
+        The dict extract_OleFormVariables returns for the control
+        '''
+        values = dict((name, getattr(self, name)) for name in self.SITE_FIELDS)
+        for name in self.OPTIONAL_FIELDS:
+            if getattr(self, name) is not None:
+                values[name] = getattr(self, name)
+        return values
+
+    def __repr__(self):
+        return "form_control({!r}, {!r})".format(self.form, self.as_dict())
+
+
+def storage_index(ole):
+    '''
+    {storage path as a tuple: {lower case stream name: directory entry}} for every storage, root is (),
+    from one walk of the directory tree, in listdir order
+    '''
+    index = OrderedDict()
+    pending = [((), ole.root)]
+    while pending:
+        path, node = pending.pop()
+        streams = index[path] = {}
+        storages = []
+        for kid in node.kids:
+            if kid.entry_type == olefile.STGTY_STORAGE:
+                storages.append((path + (kid.name,), kid))
+            elif kid.entry_type == olefile.STGTY_STREAM:
+                streams[kid.name.lower()] = kid
+        pending.extend(reversed(storages))
+    return index
+
+
+def form_storages(ole, index=None):
+    '''
+    Yields (path, f entry, o entry) for every storage holding both an f and an o stream, nested frames
+    included. Pass the storage_index if there is one already.
+    '''
+    if index is None:
+        index = storage_index(ole)
+    for path, streams in index.items():
+        if "f" in streams and "o" in streams:
+            yield list(path), streams["f"], streams["o"]
+
+
+def open_entry(ole, entry, path):
+    '''
+    openstream() finds the entry by path first, a linear search of every storage on the way, so with
+    thousands of forms in one storage opening each of them by path is quadratic
+    '''
+    return form_stream(ole._open(entry.isectStart, entry.size), '/'.join(path + [entry.name]))
+
+
+def iter_forms(ole, index=None):
+    '''
+    Yields (path of the f stream, generator of its form_controls) for every form in the document, each
+    stream is opened once. Read the controls before moving on to the next form.
+    '''
+    for path, f_entry, o_entry in form_storages(ole, index):
+        yield path + [f_entry.name], open_form_controls(ole, path, f_entry, o_entry)
+
+
+def open_form_controls(ole, path, f_entry, o_entry):
+    '''
+    The streams are opened when the first control is read, so a form that can't be read raises
+    while its controls are read, not in iter_forms
+    '''
+    for control in iter_form_controls(open_entry(ole, f_entry, path), open_entry(ole, o_entry, path),
+                                      path + [f_entry.name]):
+        yield control
+
+
+def iter_controls(ole):
+    '''
+    Yields a form_control for every control in the document as it is decoded, nothing is kept between
+    them, so a whole corpus can be streamed through in constant memory
+    '''
+    for _, controls in iter_forms(ole):
+        for control in controls:
+            yield control
+
+
+# Functions from oletools.oleform that I patched to handle non-standard form controls.
+# consume_FormControl_PATCHED, consume_OleSiteConcreteControl_PATCHED and consume_SiteClassInfo_PATCHED are
+# copies of consume_FormControl, consume_OleSiteConcreteControl and consume_SiteClassInfo from oletools 0.56.2
+# (oletools/oleform.py) that also keep the class table and ObjectStreamSize. Drop them once oleform exposes both.
 def extract_OleFormVariables_PATCHED(ole_file, stream_dir):
-    control = ExtendedStream.open(ole_file, '/'.join(stream_dir + ['f']))
-    variables = list(consume_FormControl(control))
-    data = ExtendedStream.open(ole_file, '/'.join(stream_dir + ['o']))
-    for var in variables:
-        # See FormEmbeddedActiveXControlCached for type definition: [MS-OFORMS] 2.4.5
-        if var['ClsidCacheIndex'] == 7:
-            consume_FormControl(data)
-        elif var['ClsidCacheIndex'] == 12:
-            consume_ImageControl(data)
-        elif var['ClsidCacheIndex'] == 14:
-            consume_FormControl(data)
-        elif var['ClsidCacheIndex'] in [15, 23, 24, 25, 26, 27, 28]:
-            var['value'], var['caption'], var['group_name'] = consume_MorphDataControl(data)
-        elif var['ClsidCacheIndex'] == 16:
-            consume_SpinButtonControl(data)
-        elif var['ClsidCacheIndex'] == 17:
-            consume_CommandButtonControl(data)
-        elif var['ClsidCacheIndex'] == 18:
-            consume_TabStripControl(data)
-        elif var['ClsidCacheIndex'] == 21:
-            var['caption'] = consume_LabelControl(data)
-        elif var['ClsidCacheIndex'] == 47:
-            consume_ScrollBarControl(data)
-        elif var['ClsidCacheIndex'] == 57:
-            consume_FormControl(data)
-        elif var['ClsidCacheIndex'] > 0x7FFF:
-            #print control.classTable
-            if control.classTable[var['ClsidCacheIndex'] - 0x8000] == "\xf5\x59\xca\xe5\xc4\x57\xd8\x4d\x9b\xd6\x1d\xee\xed\xd2\x7a\xf4":
-                control_data = inkeditControl(data).property_values
-                var['raw_data'] = control_data
-                var['factorid'] = control_data['factorid']
-                var['rtf_data'] = control_data['rtf_data']
-                var['text'] = control_data['text']
-                var['non_ms_type'] = "InkEdit"
+    control = form_stream.open(ole_file, '/'.join(stream_dir + ['f']))
+    data = form_stream.open(ole_file, '/'.join(stream_dir + ['o']))
+    return [var.as_dict() for var in iter_form_controls(control, data, stream_dir + ['f'])]
+
+
+def iter_form_controls(control, data, form):
+    '''
+    control and data are the form_streams of a form's f and o streams. Each site is read from f
+    only when the one before it has been decoded from o. A control with no registered decoder is
+    skipped by its ObjectStreamSize, as is whatever a decoder leaves unread. A site that doesn't store
+    the size has none in o, [MS-OFORMS] 2.2.10.12.3 makes the default 0, so nothing is decoded for it.
+    A control whose decoder fails is skipped the same way with the error in its error field, the
+    controls after it are still read.
+    '''
+    for site in consume_FormControl_PATCHED(control):
+        var = form_control(form, site)
+        start = data.tell()
+        decoder = find_decoder(var.ClsidCacheIndex, control.classTable)
+        if decoder is not None and var.ObjectStreamSize:
+            try:
+                decoder(data, var)
+            except Exception as e:
+                var.error = "{}: {}".format(type(e).__name__, e)
+        data.skip_to(start + (var.ObjectStreamSize or 0))
+        yield var
+
+
+def consume_FormControl_PATCHED(stream):
+    # FormControl: [MS-OFORMS] 2.2.10.1, the class table is kept on the stream to tell what a
+    # non-standard control is
+    stream.check_values('FormControl (versions)', '<BB', 2, (0, 4))
+    cbform = stream.unpack('<H', 2)
+    with stream.will_jump_to(cbform):
+        propmask = FormPropMask(stream.unpack('<L', 4))
+        # FormDataBlock: [MS-OFORMS] 2.2.10.3
+        propmask.consume(stream, [('fBackColor', 4), ('fForeColor', 4), ('fNextAvailableID', 4)])
+        if propmask.fBooleanProperties:
+            BooleanProperties = stream.unpack('<L', 4)
+            FORM_FLAG_DONTSAVECLASSTABLE = (BooleanProperties & (1<<15)) >> 15
         else:
-            # TODO: use logging instead of print
-            print('ERROR: Unsupported stored type in user form: {0}'.format(str(var['ClsidCacheIndex'])))
-            break
-    return variables
-
-# Need to save classTable to determine what control non-standard control is
-def ExtendedStream__init__PATCHED(self, stream, path):
-    self._pos = 0
-    self._jumps = []
-    self._stream = stream
-    self._path = path
-    self._padding = False
-    self._pad_start = 0
-    self.classTable = []
+            FORM_FLAG_DONTSAVECLASSTABLE = 0
+        # Skip the rest of DataBlock and ExtraDataBlock
+    # FormStreamData: [MS-OFORMS] 2.2.10.5
+    if propmask.fMouseIcon:
+        consume_GuidAndPicture(stream)
+    if propmask.fFont:
+        consume_GuidAndFont(stream)
+    if propmask.fPicture:
+        consume_GuidAndPicture(stream)
+    # FormSiteData: [MS-OFORMS] 2.2.10.6
+    if not FORM_FLAG_DONTSAVECLASSTABLE:
+        CountOfSiteClassInfo = stream.unpack('<H', 2)
+        for i in range(CountOfSiteClassInfo):
+            consume_SiteClassInfo_PATCHED(stream)
+    (CountOfSites, CountOfBytes) = stream.unpacks('<LL', 8)
+    remaining_SiteDepthsAndTypes = CountOfSites
+    with stream.will_jump_to(CountOfBytes):
+        with stream.will_pad():
+            while remaining_SiteDepthsAndTypes > 0:
+                remaining_SiteDepthsAndTypes -= consume_FormObjectDepthTypeCount(stream)
+        for i in range(CountOfSites):
+            yield consume_OleSiteConcreteControl_PATCHED(stream)
+
+
+def consume_OleSiteConcreteControl_PATCHED(stream):
+    # OleSiteConcreteControl: [MS-OFORMS] 2.2.10.12.1, also returns ObjectStreamSize, None if it wasn't stored
+    stream.check_value('OleSiteConcreteControl (version)', '<H', 2, 0)
+    cbSite = stream.unpack('<H', 2)
+    with stream.will_jump_to(cbSite):
+        propmask = SitePropMask(stream.unpack('<L', 4))
+        # SiteDataBlock: [MS-OFORMS] 2.2.10.12.3
+        with stream.padded_struct():
+            name_len = tag_len = id = 0
+            if propmask.fName:
+                name_len = consume_CountOfBytesWithCompressionFlag(stream)
+            if propmask.fTag:
+                tag_len = consume_CountOfBytesWithCompressionFlag(stream)
+            if propmask.fID:
+                id = stream.unpack('<L', 4)
+            propmask.consume(stream, [('fHelpContextID', 4), ('fBitFlags', 4)])
+            ObjectStreamSize = None
+            if propmask.fObjectStreamSize:
+                ObjectStreamSize = stream.unpack('<L', 4)
+            tabindex = ClsidCacheIndex = 0
+            if propmask.fTabIndex:
+                tabindex = stream.unpack('<H', 2)
+            if propmask.fClsidCacheIndex:
+                ClsidCacheIndex = stream.unpack('<H', 2)
+            if propmask.fGroupID:
+                stream.read(2)
+            # Get the size of the ControlTipText, if needed.
+            control_tip_text_len = 0
+            if propmask.fControlTipText:
+                control_tip_text_len = consume_CountOfBytesWithCompressionFlag(stream)
+            propmask.consume(stream, [('fRuntimeLicKey', 4), ('fControlSource', 4), ('fRowSource', 4)])
+        # SiteExtraDataBlock: [MS-OFORMS] 2.2.10.12.4
+        name = None
+        if (name_len > 0):
+            name = stream.read(name_len)
+        tag = None
+        if (tag_len > 0):
+            tag = stream.read(tag_len)
+        # Skip SitePosition.
+        if propmask.fPosition:
+            stream.read(8)
+        control_tip_text = stream.read(control_tip_text_len)
+        if (len(control_tip_text) == 0):
+            control_tip_text = None
+        return {'name': name, 'tag': tag, 'id': id, 'tabindex': tabindex,
+                'ClsidCacheIndex': ClsidCacheIndex, 'value': None, 'caption': None,
+                'control_tip_text':control_tip_text, 'ObjectStreamSize': ObjectStreamSize}
 
 
 def consume_SiteClassInfo_PATCHED(stream):
@@ -190,27 +475,53 @@ def consume_SiteClassInfo_PATCHED(stream):
         propmask.consume(stream, [('fDispEvent', 16), ('fDefaultProg', 16)])
 
 
-# Replace orginal functions with patched functions
-consume_FormControl.func_globals['consume_SiteClassInfo'] = consume_SiteClassInfo_PATCHED
+# oletools.oleform itself is left as it is, only this module's name points at the patched function
 extract_OleFormVariables = extract_OleFormVariables_PATCHED
-ExtendedStream.__init__ = ExtendedStream__init__PATCHED
+
+MANIFEST_TOOL = "inkedit_parser"
+
+
+def inkedit_report(filename):
+    '''
+    Returns what is printed for a document, each form storage followed by its InkEdit controls
+    '''
+    ole = olefile.OleFileIO(filename)
+    lines = []
+
+    # Call parser
+    try:
+        for path, controls in iter_forms(ole):
+            lines.append(str(path))
+            for control in controls:
+                if control.non_ms_type == "InkEdit" or control.error: # a control that failed to decode may be one
+                    lines.append(pformat(control.as_dict()))
+    finally:
+        ole.close() # a batch run would keep a handle and its mmap for every document that failed
+    return "\n".join(lines)
 
 
 if __name__ == "__main__":
     my_argparser = argparse.ArgumentParser()
     
     my_argparser.add_argument("-f", "--file", type=str, help="Document to extract files from")
+    my_argparser.add_argument("--manifest", type=str, help="SQLite file of the documents scanned before, the report of an unchanged one is replayed", default="")
+    my_argparser.add_argument("--manifest-skip", action='store_true', help="Print nothing for a document unchanged since the manifest", default=False)
+    my_argparser.add_argument("--manifest-hash", action='store_true', help="Hash the document instead of trusting an unchanged size and mtime", default=False)
 
     args = my_argparser.parse_args()
 
-    ole = olefile.OleFileIO(args.file)
-    dirs = ole.listdir()
-
-    # Call parser
-    for dir in dirs:
-        if dir[-1] == "f" and (dir[:2] + ["o"]) in dirs:
-            print dir
-            controls = extract_OleFormVariables(ole, dir[:2])
-            for control in controls:
-                if "non_ms_type" in control and control["non_ms_type"] == "InkEdit":
-                    pprint(control)
+    if not args.manifest:
+        report = inkedit_report(args.file)
+    else:
+        import scan_manifest
+        manifest = scan_manifest.open_manifest(args.manifest)
+        # no options change the report, only the version does
+        entry = manifest.check(MANIFEST_TOOL, args.file, __version__, scan_manifest.config_version({}), args.manifest_hash)
+        report = entry.output
+        if report is None:
+            report = inkedit_report(args.file)
+            manifest.record(entry, report)
+        elif args.manifest_skip:
+            report = ""
+    if report:
+        print report
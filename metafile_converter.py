@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+
+__description__ = 'Convert EMF/WMF to PNG with a pool of long lived headless LibreOffice processes'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Starting LibreOffice costs seconds, so extract_img.py used to pay that for every metafile it wanted
+to OCR. Here a small pool of soffice processes is started once and kept running, each with its own
+user profile. If the python UNO bindings are installed the documents are loaded and exported through
+the running process, which takes tens of milliseconds per image. The fast path needs UNO: without it
+nothing is kept running, every document's metafiles are converted together with one --convert-to call
+on the worker's already initialised profile, and that call still starts soffice, seconds per document.
+
+Every conversion job gets its own temp directory, so runs can't overwrite each other's files.
+
+Usage:
+converter = get_converter(pool_size=2)
+pngs = converter.convert([("emf", emf_data), ("wmf", wmf_data)]) # list of PNG data, None if it failed
+
+History:
+  2026/10/18: start
+  2026/10/18: Say plainly that only UNO avoids starting soffice for every document
+"""
+
+import atexit
+import multiprocessing.util
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    ENABLE_UNO = True
+except:
+    ENABLE_UNO = False
+
+OFFICE_BINARIES = ["soffice", "libreoffice"]
+CONNECT_TIMEOUT = 60
+CONVERT_TIMEOUT = 120
+
+
+def find_office():
+    for name in OFFICE_BINARIES:
+        path = which(name)
+        if path:
+            return path
+    return None
+
+
+def run_with_timeout(cmd, timeout):
+    '''
+    subprocess.call without a timeout argument on python 2, kill the process if it takes too long
+    '''
+    with open(os.devnull, "w") as devnull:
+        proc = subprocess.Popen(cmd, stdout=devnull, stderr=devnull)
+        deadline = time.time() + timeout
+        while proc.poll() is None:
+            if time.time() > deadline:
+                proc.kill()
+                proc.wait()
+                return None
+            time.sleep(0.05)
+    return proc.returncode
+
+
+def _props(**kwargs):
+    props = []
+    for name, value in kwargs.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+class office_worker():
+    '''
+    One soffice process with its own profile directory. With UNO the process is started listening on
+    a pipe and kept running, otherwise the profile is kept and used for the --convert-to calls.
+    '''
+
+    def __init__(self, binary):
+        self.binary = binary
+        self.profile = tempfile.mkdtemp(prefix="doctools_office_")
+        self.profile_url = "file://" + self.profile
+        self.proc = None
+        self.desktop = None
+        if ENABLE_UNO:
+            try:
+                self.start()
+            except IOError:
+                pass # falls back to --convert-to with this worker's profile
+
+    def start(self):
+        pipe_name = "doctools_{}_{}".format(os.getpid(), os.path.basename(self.profile))
+        with open(os.devnull, "w") as devnull:
+            self.proc = subprocess.Popen([self.binary, "--headless", "--invisible", "--nologo", "--norestore",
+                                          "--nodefault", "--nolockcheck", "-env:UserInstallation=" + self.profile_url,
+                                          "--accept=pipe,name={};urp;StarOffice.ComponentContext".format(pipe_name)],
+                                         stdout=devnull, stderr=devnull)
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver",
+                                                                          local_context)
+        deadline = time.time() + CONNECT_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve("uno:pipe,name={};urp;StarOffice.ComponentContext".format(pipe_name))
+                break
+            except Exception:
+                if time.time() > deadline or self.proc.poll() is not None:
+                    self.stop()
+                    raise IOError("could not connect to soffice")
+                time.sleep(0.1)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.profile, ignore_errors=True)
+
+    def convert_files(self, job_dir, names):
+        '''
+        Converts job_dir/<name> to job_dir/<name without ext>.png for each name
+        '''
+        if self.desktop is None:
+            run_with_timeout([self.binary, "--headless", "--norestore", "-env:UserInstallation=" + self.profile_url,
+                              "--convert-to", "png", "--outdir", job_dir] +
+                             [os.path.join(job_dir, name) for name in names], CONVERT_TIMEOUT)
+            return
+
+        for name in names:
+            src = os.path.join(job_dir, name)
+            dst = os.path.splitext(src)[0] + ".png"
+            doc = self.desktop.loadComponentFromURL(uno.systemPathToFileUrl(src), "_blank", 0, _props(Hidden=True))
+            try:
+                doc.storeToURL(uno.systemPathToFileUrl(dst), _props(FilterName="draw_png_Export"))
+            finally:
+                doc.close(True)
+
+
+class metafile_converter():
+
+    def __init__(self, pool_size=1, binary=None):
+        self.binary = binary or find_office()
+        if not self.binary:
+            raise IOError("LibreOffice not found")
+        self.workers = []
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.pool_size = max(1, pool_size)
+
+    def _acquire(self):
+        # workers are started on first use, a run without metafiles never starts soffice
+        with self.lock:
+            if self.idle.empty() and len(self.workers) < self.pool_size:
+                worker = office_worker(self.binary)
+                self.workers.append(worker)
+                return worker
+        return self.idle.get()
+
+    def convert(self, metafiles):
+        '''
+        metafiles is a list of (pic_type, data), data can be any buffer or a file. All of them are converted in
+        one job, returns the PNG data for each in the same order, None where the conversion failed.
+        '''
+        if not metafiles:
+            return []
+
+        job_dir = tempfile.mkdtemp(prefix="doctools_convert_")
+        worker = self._acquire()
+        try:
+            names = []
+            for i, (pic_type, data) in enumerate(metafiles):
+                name = "{}.{}".format(i, pic_type)
+                with open(os.path.join(job_dir, name), "wb") as fo:
+                    if hasattr(data, "read"):
+                        data.seek(0)
+                        shutil.copyfileobj(data, fo)
+                    else:
+                        fo.write(data)
+                names.append(name)
+
+            try:
+                worker.convert_files(job_dir, names)
+            except Exception:
+                # soffice died or hung up on us, start a fresh one for the next job
+                worker.stop()
+                if ENABLE_UNO:
+                    try:
+                        worker.start()
+                    except IOError:
+                        pass # falls back to --convert-to with this worker's profile
+
+            pngs = []
+            for i in range(len(names)):
+                png_name = os.path.join(job_dir, "{}.png".format(i))
+                if os.path.exists(png_name):
+                    with open(png_name, "rb") as fi:
+                        pngs.append(fi.read())
+                else:
+                    pngs.append(None)
+            return pngs
+        finally:
+            self.idle.put(worker)
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def close(self):
+        with self.lock:
+            for worker in self.workers:
+                worker.close()
+            self.workers = []
+            self.idle = queue.Queue()
+
+
+_converters = {}
+
+
+def get_converter(pool_size=1):
+    '''
+    One converter per process, batch mode workers each get their own after the fork
+    '''
+    key = os.getpid()
+    if key not in _converters:
+        _converters[key] = metafile_converter(pool_size)
+        # pool workers leave through os._exit, atexit doesn't run there but multiprocessing finalizers do
+        multiprocessing.util.Finalize(None, _close_converters, exitpriority=10)
+    return _converters[key]
+
+
+@atexit.register
+def _close_converters():
+    converter = _converters.pop(os.getpid(), None)
+    if converter:
+        converter.close()
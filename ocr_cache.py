@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+__description__ = 'On disk cache of OCR results keyed by image sha256 and OCR settings'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+The same lure images show up in thousands of documents, running tesseract on them again is the
+slowest part of extract_img.py. Results are stored in SQLite so the cache can be shared by the batch
+mode worker processes. The total size of the stored rows is kept by triggers, once it goes over the
+limit the least recently used rows are evicted.
+
+Usage:
+$ python extract_img.py -f ../test_docs/image_in_doc.doc -o --ocr-cache ~/.cache/doctools_ocr.sqlite
+
+$ python ocr_cache.py --stats ~/.cache/doctools_ocr.sqlite
+{'rows': 1843, 'size': 2412211}
+
+History:
+  2026/10/18: start
+  2026/10/18: Create the tables one statement at a time, workers opening a new cache together no longer fail
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# one statement each, execute() prepares again when another batch worker creates the tables first,
+# executescript() fails with "database schema has changed", see image_store.py
+SCHEMA = ['''
+CREATE TABLE IF NOT EXISTS ocr_results (
+    sha256 TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    ocr_text TEXT NOT NULL,
+    freq_color TEXT,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (sha256, settings)
+)''', '''
+CREATE INDEX IF NOT EXISTS ocr_results_last_used ON ocr_results (last_used)''', '''
+CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)''', '''
+INSERT OR IGNORE INTO cache_size (id, total) VALUES (0, 0)''', '''
+CREATE TRIGGER IF NOT EXISTS ocr_results_insert AFTER INSERT ON ocr_results BEGIN
+    UPDATE cache_size SET total = total + NEW.size WHERE id = 0;
+END''', '''
+CREATE TRIGGER IF NOT EXISTS ocr_results_delete AFTER DELETE ON ocr_results BEGIN
+    UPDATE cache_size SET total = total - OLD.size WHERE id = 0;
+END''']
+
+EVICT_TO = 0.9 # evict down to 90% of the limit, so every insert at the limit isn't an eviction
+
+_open_caches = {}
+
+
+def open_cache(path, max_size):
+    '''
+    Returns one cache per path for this process. Batch mode workers fork before the first lookup,
+    so each of them ends up with its own connection.
+    '''
+    key = (os.getpid(), path)
+    if key not in _open_caches:
+        _open_caches[key] = ocr_cache(path, max_size)
+    return _open_caches[key]
+
+
+class ocr_cache():
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        # the daemon looks things up from its worker threads, they share the connection under the lock
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL") # readers don't block the other batch workers
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA recursive_triggers=ON") # so INSERT OR REPLACE runs the delete trigger too
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def get(self, sha256, settings):
+        '''
+        Returns (ocr_text, freq_color) or None, freq_color comes back as ([r, g, b], hex string)
+        '''
+        with self.lock:
+            row = self.db.execute("SELECT ocr_text, freq_color FROM ocr_results WHERE sha256 = ? AND settings = ?",
+                                  (sha256, settings)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            with self.db:
+                self.db.execute("UPDATE ocr_results SET last_used = ? WHERE sha256 = ? AND settings = ?",
+                                (time.time(), sha256, settings))
+        freq_color = tuple(json.loads(row[1])) if row[1] else None
+        return row[0], freq_color
+
+    def put(self, sha256, settings, ocr_text, freq_color):
+        if isinstance(ocr_text, bytes):
+            ocr_text = ocr_text.decode("utf-8", "replace")
+        if freq_color is not None:
+            peak, colour = freq_color
+            freq_color = json.dumps([[int(c) for c in peak], colour])
+        size = len(sha256) + len(settings) + len(ocr_text) + len(freq_color or "")
+
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?, ?, ?, ?)",
+                            (sha256, settings, ocr_text, freq_color, size, time.time()))
+            if self.max_size:
+                self.evict(int(self.max_size * EVICT_TO) if self.size() > self.max_size else None)
+
+    def evict(self, target):
+        if target is None:
+            return
+        size = self.size()
+        while size > target:
+            # guess how many rows to drop from the average row size, instead of deleting one at a time
+            rows = self.db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+            if rows == 0:
+                break
+            count = max(1, int((size - target) * rows / size))
+            self.db.execute("DELETE FROM ocr_results WHERE rowid IN "
+                            "(SELECT rowid FROM ocr_results ORDER BY last_used LIMIT ?)", (count,))
+            size = self.size()
+
+    def size(self):
+        return self.db.execute("SELECT total FROM cache_size WHERE id = 0").fetchone()[0]
+
+    def stats(self):
+        with self.lock:
+            rows = self.db.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+            return {"rows": rows, "size": self.size(), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("cache", type=str, help="OCR cache database")
+    my_argparser.add_argument("--stats", action='store_true', help="Print number of rows and size of the cache", default=False)
+    my_argparser.add_argument("--evict-to", type=int, help="Evict least recently used rows until the cache is under X MB", default=-1)
+
+    args = my_argparser.parse_args()
+
+    cache = ocr_cache(args.cache, 0)
+    if args.evict_to >= 0:
+        with cache.db:
+            cache.evict(args.evict_to * 1024 * 1024)
+    if args.stats:
+        stats = cache.stats()
+        print({"rows": stats["rows"], "size": stats["size"]})
+    cache.close()
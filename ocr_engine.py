@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+__description__ = 'OCR backends with warm per thread engines and a bounded pool to run them on'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+pytesseract forks a tesseract process and loads the language data for every image. If tesserocr is
+installed each pool thread keeps its own PyTessBaseAPI instead, tesserocr lets go of the GIL while
+recognizing so the threads run in parallel. pytesseract still works as the fallback, the pool then
+keeps several tesseract processes busy at once.
+
+Very large images can be cut into overlapping horizontal strips that are recognized at the same time
+on a separate tile pool, merge_strip_texts puts the text back together and drops the lines the
+strips have in common. The tile pool is separate so an image being OCR'd on the main pool never waits
+for tiles queued behind it.
+
+Usage:
+pool = get_pool(4)
+jobs = [pool.submit(func, image) for image in images]
+texts = [job.get() for job in jobs] # same order as submitted
+
+strips = split_strips(img.height, 4)
+jobs = [get_tile_pool(4).submit(image_to_string, img.crop((0, top, img.width, bottom))) for top, bottom in strips]
+text = merge_strip_texts([job.get() for job in jobs])
+
+History:
+  2026/10/18: start
+"""
+
+import difflib
+import os
+import threading
+from multiprocessing import TimeoutError # raised by get() on a job not done in time, so callers needn't import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+try:
+    import tesserocr
+    ENABLE_TESSEROCR = True
+except:
+    ENABLE_TESSEROCR = False
+
+try:
+    import pytesseract
+    ENABLE_PYTESSERACT = True
+except:
+    ENABLE_PYTESSERACT = False
+
+
+class tesserocr_engine():
+
+    def __init__(self, lang="eng"):
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def image_to_string(self, img):
+        self.api.SetImage(img)
+        return self.api.GetUTF8Text()
+
+    def close(self):
+        self.api.End()
+
+
+class pytesseract_engine():
+
+    def __init__(self, lang="eng"):
+        self.lang = lang
+
+    def image_to_string(self, img):
+        return pytesseract.image_to_string(img, lang=self.lang)
+
+    def close(self):
+        pass
+
+
+BACKENDS = {"tesserocr": tesserocr_engine, "pytesseract": pytesseract_engine}
+
+TILE_MIN_HEIGHT = 400 # strips aren't made shorter than this
+TILE_MIN_OVERLAP = 128 # pixels, a few lines of text after --ocr-resize
+LINE_MATCH_RATIO = 0.8 # a line recognized in two strips can come out slightly different in each
+MAX_OVERLAP_LINES = 10
+
+_local = threading.local()
+
+
+def pick_backend(backend):
+    if backend == "auto":
+        return "tesserocr" if ENABLE_TESSEROCR else "pytesseract"
+    return backend
+
+
+def get_engine(backend="auto"):
+    '''
+    One engine per thread and backend, created on first use and kept for the life of the thread
+    '''
+    backend = pick_backend(backend)
+    engines = getattr(_local, "engines", None)
+    if engines is None:
+        engines = _local.engines = {}
+    if backend not in engines:
+        engines[backend] = BACKENDS[backend]()
+    return engines[backend]
+
+
+def image_to_string(img, backend="auto"):
+    return get_engine(backend).image_to_string(img)
+
+
+class _finished():
+    '''
+    Looks like an AsyncResult for work that was run straight away
+    '''
+
+    def __init__(self, func, args):
+        try:
+            self.value = func(*args)
+            self.error = None
+        except Exception as e:
+            self.value = None
+            self.error = e
+
+    def get(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ocr_pool():
+    '''
+    With one worker everything runs in the calling thread as before, otherwise jobs go to a fixed
+    size thread pool so at most workers images are decoded and recognized at the same time
+    '''
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = ThreadPool(workers) if workers > 1 else None
+
+    def submit(self, func, *args):
+        if self.pool is None:
+            return _finished(func, args)
+        return self.pool.apply_async(func, args)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+_pools = {}
+
+
+def get_pool(workers, kind="images"):
+    '''
+    One pool per process, kind and size, batch mode workers each get their own after the fork
+    '''
+    key = (os.getpid(), kind, workers)
+    if key not in _pools:
+        _pools[key] = ocr_pool(workers)
+    return _pools[key]
+
+
+def get_tile_pool(workers):
+    return get_pool(workers, "tiles")
+
+
+def split_strips(height, count):
+    '''
+    Returns (top, bottom) of up to count horizontal strips covering height. Each overlaps the next by
+    a sixth of its height, at least TILE_MIN_OVERLAP, so every line of text is whole in one of them.
+    '''
+    count = min(count, max(1, height // TILE_MIN_HEIGHT))
+    if count <= 1:
+        return [(0, height)]
+    step = -(-height // count)
+    overlap = max(TILE_MIN_OVERLAP, step // 6)
+    return [(top, min(height, top + step + overlap)) for top in range(0, height, step)]
+
+
+def _same_line(a, b):
+    return a == b or difflib.SequenceMatcher(None, a, b).ratio() >= LINE_MATCH_RATIO
+
+
+def _join_overlap(above, below):
+    '''
+    The last lines of above are the first lines of below. The line a strip edge cuts through comes out
+    garbled, so one line can be skipped on either side, the whole copy of it is in the other strip.
+    '''
+    best = None # (lines in common, skipped at the end of above, skipped at the start of below)
+    for skip_above in (0, 1):
+        for skip_below in (0, 1):
+            end = len(above) - skip_above
+            for common in range(min(end, len(below) - skip_below, MAX_OVERLAP_LINES), 0, -1):
+                if all(_same_line(above[end - common + i], below[skip_below + i]) for i in range(common)):
+                    if best is None or common > best[0]:
+                        best = (common, skip_above, skip_below)
+                    break
+    if best is None:
+        return above + below
+    common, skip_above, skip_below = best
+    return above[:len(above) - skip_above] + below[skip_below + common:]
+
+
+def merge_strip_texts(texts):
+    '''
+    Joins the text of strips from split_strips, top to bottom, without the lines they overlap on
+    '''
+    merged = []
+    for text in texts:
+        merged = _join_overlap(merged, [line.strip() for line in text.splitlines() if line.strip()])
+    return "\n".join(merged)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+__description__ = 'dHash of extracted images and a SQLite near-duplicate index to reuse OCR results'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+The OCR cache only helps when an image is byte for byte the same. Lures get re-encoded, cropped by a
+pixel or saved at another quality, so each copy is OCR'd again. A dHash of the image stays within a few
+bits across those changes.
+
+dhash shrinks the grayscale image to 9x8 and sets a bit where a pixel is brighter than the one to its
+left, the comparison and bit packing are done on the whole array at once. JPEGs are decoded straight
+at a reduced scale with draft().
+
+The index uses multi-index hashing: the 64 bit hash is split into CHUNKS 16 bit chunks, each with its
+own SQLite index. Two hashes within radius r bits of each other have at least one chunk within
+r // CHUNKS bits, so a query probes every chunk value that close, then checks the full distance on the
+few rows that come back. Only rows sharing a close chunk are read, about 10 times faster than a numpy
+scan over a million hashes (benchmarks/bench_near_dup.py).
+
+Usage:
+$ python extract_img.py -f ../test_docs/image_in_doc.doc -o --near-dup-index ~/.cache/doctools_dhash.sqlite
+
+$ python perceptual_hash.py --hash lure.png lure_reencoded.jpg
+$ python perceptual_hash.py --stats ~/.cache/doctools_dhash.sqlite
+{'rows': 1843}
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import binascii
+import io
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+CHUNKS = 4 # the schema has a column and an index per chunk
+CHUNK_BITS = HASH_SIZE * HASH_SIZE // CHUNKS
+DEFAULT_RADIUS = 6
+
+# one statement each, see image_store.SCHEMA
+SCHEMA = ['''
+CREATE TABLE IF NOT EXISTS near_dups (
+    sha256 TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    dhash TEXT NOT NULL,
+    c0 INTEGER NOT NULL,
+    c1 INTEGER NOT NULL,
+    c2 INTEGER NOT NULL,
+    c3 INTEGER NOT NULL,
+    ocr_text TEXT NOT NULL,
+    freq_color TEXT,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (sha256, settings)
+)'''] + ["CREATE INDEX IF NOT EXISTS near_dups_c{0} ON near_dups (settings, c{0})".format(i) for i in range(CHUNKS)]
+
+
+def dhash(img):
+    '''
+    img is a PIL image or the encoded image data, returns the hash as an int
+    '''
+    if not isinstance(img, Image.Image):
+        img = Image.open(io.BytesIO(img))
+        img.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4)) # JPEG only, decodes at 1/2 to 1/8 scale
+    pixels = np.asarray(img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR), dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int(binascii.hexlify(np.packbits(bits).tobytes()), 16)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def chunks(value):
+    mask = (1 << CHUNK_BITS) - 1
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & mask for i in range(CHUNKS)]
+
+
+def chunk_probes(chunk, distance):
+    '''
+    Every chunk value within distance bits of chunk
+    '''
+    probes = [chunk]
+    for flips in range(1, distance + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), flips):
+            value = chunk
+            for bit in bits:
+                value ^= 1 << bit
+            probes.append(value)
+    return probes
+
+
+_open_indexes = {}
+
+
+def open_index(path):
+    '''
+    Returns one index per path for this process, like ocr_cache.open_cache
+    '''
+    key = (os.getpid(), path)
+    if key not in _open_indexes:
+        _open_indexes[key] = near_dup_index(path)
+    return _open_indexes[key]
+
+
+class near_dup_index():
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def query(self, value, settings, radius=DEFAULT_RADIUS):
+        '''
+        Returns every (distance, sha256, dhash) within radius bits of value, closest first
+        '''
+        distance = radius // CHUNKS
+        selects = []
+        params = []
+        for i, chunk in enumerate(chunks(value)):
+            probes = chunk_probes(chunk, distance)
+            selects.append("SELECT sha256, dhash FROM near_dups WHERE settings = ? AND c{} IN ({})"
+                           .format(i, ", ".join("?" * len(probes))))
+            params += [settings] + probes
+        with self.lock:
+            rows = self.db.execute(" UNION ".join(selects), params).fetchall()
+        matches = []
+        for sha256, other in rows:
+            other = int(other, 16)
+            if hamming(value, other) <= radius:
+                matches.append((hamming(value, other), sha256, other))
+        return sorted(matches)
+
+    def get(self, value, settings, radius=DEFAULT_RADIUS, prefer=None):
+        '''
+        Returns (sha256, distance, ocr_text, freq_color) of the closest image within radius, or None.
+        Between images at the same distance the one with sha256 prefer is picked, freq_color comes back as
+        ([r, g, b], hex string)
+        '''
+        matches = self.query(value, settings, radius)
+        if not matches:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        distance, sha256, _ = min(matches, key=lambda match: (match[0], match[1] != prefer))
+        with self.lock:
+            row = self.db.execute("SELECT ocr_text, freq_color FROM near_dups WHERE sha256 = ? AND settings = ?",
+                                  (sha256, settings)).fetchone()
+            with self.db:
+                self.db.execute("UPDATE near_dups SET last_used = ? WHERE sha256 = ? AND settings = ?",
+                                (time.time(), sha256, settings))
+        freq_color = tuple(json.loads(row[1])) if row[1] else None
+        return sha256, distance, row[0], freq_color
+
+    def put(self, sha256, settings, value, ocr_text, freq_color):
+        if isinstance(ocr_text, bytes):
+            ocr_text = ocr_text.decode("utf-8", "replace")
+        if freq_color is not None:
+            peak, colour = freq_color
+            freq_color = json.dumps([[int(c) for c in peak], colour])
+
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO near_dups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            [sha256, settings, "{:016x}".format(value)] + chunks(value) +
+                            [ocr_text, freq_color, time.time()])
+
+    def stats(self):
+        with self.lock:
+            rows = self.db.execute("SELECT COUNT(*) FROM near_dups").fetchone()[0]
+        return {"rows": rows, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("--hash", type=str, nargs="+", metavar="IMAGE", help="Print the dHash of images, and the distance to the first")
+    my_argparser.add_argument("--stats", type=str, metavar="INDEX", help="Print the number of rows in a near-duplicate index")
+
+    args = my_argparser.parse_args()
+
+    if args.hash:
+        first = None
+        for filename in args.hash:
+            with open(filename, "rb") as fi:
+                value = dhash(fi.read())
+            if first is None:
+                first = value
+            print("{:016x} {:>2} {}".format(value, hamming(first, value), filename))
+    if args.stats:
+        index = near_dup_index(args.stats)
+        print({"rows": index.stats()["rows"]})
+        index.close()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+__description__ = 'Per stage timings and counters for the extract_img.py pipeline'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Each stage is timed with a with block. Stages can nest, the time of a nested stage is taken off the
+one around it, so the seconds are what the stage itself spent: decompress is zlib only, the hashing
+and writing it feeds are counted under hash and save. The OCR threads keep their own nesting and
+add into the same stats under a lock, so preprocess and ocr are summed over the threads and can add
+up to more than the wall time.
+
+summary() gives a dict that goes into JSON as is, merge() adds one into another so batch runs can be
+totalled in the parent process.
+
+Usage:
+stats = pipeline_stats()
+with stats.stage("decompress", len(compressed)):
+    stream_decompress(compressed, [stats.timed("hash", img_hash.update)], max_size)
+stats.count("images.emf")
+print(stats.summary())
+
+$ python extract_img.py -f ../test_docs/image_in_doc.doc --stats --profile walk.prof
+$ python -m pstats walk.prof
+
+History:
+  2026/10/18: start
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class pipeline_stats():
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {} # name -> [seconds, calls, bytes]
+        self.counts = {}
+        self.wall_seconds = 0.0
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name, size=0):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0) # time spent in stages nested in this one
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.add(name, elapsed - nested, size)
+
+    def timed(self, name, func):
+        '''
+        Wraps a sink that takes a chunk of data, every call is timed as name and counts len(data) bytes
+        '''
+        def wrapper(data):
+            with self.stage(name, len(data)):
+                return func(data)
+        return wrapper
+
+    def add(self, name, seconds, size=0, calls=1):
+        with self.lock:
+            totals = self.stages.setdefault(name, [0.0, 0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+            totals[2] += size
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def summary(self):
+        with self.lock:
+            return {"stages": dict((name, {"seconds": round(seconds, 6), "calls": calls, "bytes": size})
+                                   for name, (seconds, calls, size) in self.stages.items()),
+                    "counts": dict(self.counts),
+                    "wall_seconds": round(self.wall_seconds, 6)}
+
+    def merge(self, summary):
+        for name, totals in summary["stages"].items():
+            self.add(name, totals["seconds"], totals["bytes"], totals["calls"])
+        for name, value in summary["counts"].items():
+            self.count(name, value)
+        with self.lock:
+            self.wall_seconds += summary["wall_seconds"]
+
+
+_profilers = {}
+
+
+def profiled(path, func, *args):
+    '''
+    Runs func under cProfile and writes the stats to path, batch mode workers add their pid to it.
+    A process keeps one profiler, so its file covers every document it has run so far.
+    '''
+    import cProfile
+    import multiprocessing
+
+    key = os.getpid()
+    if key not in _profilers:
+        _profilers[key] = cProfile.Profile()
+    profiler = _profilers[key]
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        if multiprocessing.current_process().name != "MainProcess":
+            path = "{}.{}".format(path, key)
+        profiler.dump_stats(path)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+__description__ = 'Fixed size record formats declared once and decoded with a single precompiled struct'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+Each format is a list of (name, struct code) pairs. A name of None is padding or a field we skip, its
+code should be pad bytes ("4x"). The whole format compiles to one little endian struct.Struct, and
+unpack_from decodes it in one call into a namedtuple, which has no per instance __dict__.
+
+Usage:
+header = OfficeArtRecordHeader.unpack_from(data, offset)
+header.recType, header.recLen
+offset += OfficeArtRecordHeader.size
+
+History:
+  2026/10/18: start
+"""
+
+import struct
+from collections import namedtuple
+
+
+class record_format():
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.names = [field_name for field_name, _ in fields if field_name]
+        self.struct = struct.Struct("<" + "".join(code for _, code in fields))
+        self.size = self.struct.size
+        self.record = namedtuple(name, self.names)
+
+    def unpack_from(self, data, offset=0):
+        return self.record._make(self.struct.unpack_from(data, offset))
+
+    def unpack(self, data):
+        return self.record._make(self.struct.unpack(data))
+
+
+# [MS-ODRAW] 2.2.1, recVer is the low nibble of rec_ver_instance and recInstance the other 12 bits
+OfficeArtRecordHeader = record_format("OfficeArtRecordHeader", [
+    ("rec_ver_instance", "H"), ("recType", "H"), ("recLen", "I")])
+
+# [MS-DOC] 2.9.158 PICFAndOfficeArtData, the PICF header pieces after lcb and cbHeader
+mfpf = record_format("mfpf", [
+    ("mm", "H"), ("xExt", "H"), ("yExt", "H"), ("swHMF", "H")])
+
+innerHeader = record_format("innerHeader", [
+    ("grf", "I"), (None, "4x"), ("mmPM", "H"), (None, "4x")])
+
+picmid = record_format("picmid", [
+    ("dxaGoal", "h"), ("dyaGoal", "h"), ("mx", "H"), ("my", "H"),
+    (None, "8x"),  # dxaReserved1, dyaReserved1, dxaReserved2, dyaReserved2
+    (None, "x"),  # fReserved
+    ("bpp", "B"),
+    ("brcTop80", "4s"), ("brcLeft80", "4s"), ("brcBottom80", "4s"), ("brcRight80", "4s"),
+    (None, "4x")])  # dxaReserved3, dyaReserved3
+
+# [MS-ODRAW] 2.2.32, without the record header and the variable length nameData
+OfficeArtFBSE = record_format("OfficeArtFBSE", [
+    ("btWin32", "B"), ("btMacOS", "B"), ("rgbUid", "16s"), ("tag", "H"), ("size", "I"), ("cRef", "I"),
+    ("foDelay", "I"), (None, "x"), ("cbName", "B"), (None, "2x")])
+
+# [MS-ODRAW] 2.2.31
+OfficeArtMetafileHeader = record_format("OfficeArtMetafileHeader", [
+    ("cbSize", "I"), ("rcBounds", "16s"), ("ptSize", "8s"), ("cbSave", "I"), ("compression", "B"),
+    ("filter", "B")])
+
+# InkEdit control properties in the o stream, reversed from the control, see inkedit_parser.py.
+# The padding looks like the 4 byte alignment the other MS-OFORMS controls use. The variable length
+# factorid data, then mouseIcon, font and rtf_data, each a 4 byte length and data, follow this block.
+InkEditProperties = record_format("InkEditProperties", [
+    ("version", "h"), ("cbClassTable", "h"), ("PropMask", "i"), ("data_size", "i"),
+    ("unkown_1", "I"), ("unkown_2", "I"), ("width", "i"), ("height", "i"), ("backColor", "I"),
+    ("apperance", "i"), ("borderStyle", "i"), ("MousePointer", "i"), ("InkMode", "i"),
+    ("InkInsertMode", "i"), ("RecognTimeOut", "i"), ("Locked", "h"), ("MultiLine", "h"),
+    ("disableNoScroll", "h"), (None, "2x"), ("ScrollBars", "i"), ("Enabled", "h"), (None, "2x"),
+    ("MaxLength", "i"), ("UseMouseForInput", "h"), (None, "6x"), ("factorid", "i")])
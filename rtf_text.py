@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+
+__description__ = 'Single pass RTF tokenizer, plain text, fonts and control word counts of InkEdit and other embedded RTF'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+One precompiled regex finds the next token, control word, hex escaped byte, control symbol, brace
+or run of text, from where the last one ended, so the RTF is read once and never sliced. A stack of
+group states keeps the destination, font, size and \\uc of each group. Destinations that aren't text
+(colour table, stylesheet, pictures, objects, \\* groups, ...) are tokenized but only counted, the font
+table is read for the font names. Text bytes are kept until the next control word and decoded with the
+document's \\ansicpg together, so multibyte code pages come out right. \\uN characters replace their
+\\uc fallback, \\binN data is jumped over.
+
+parse_rtf returns {"text", "fonts", "font_chars", "size_chars", "control_words"}: the plain text with
+paragraphs on their own lines, the font table, characters of text per font name and per point size,
+and how many times each control word was seen.
+
+Usage:
+$ python rtf_text.py ink.rtf
+InkEdit1
+
+$ python rtf_text.py ink.rtf --stats
+{'fonts': {0: u'MS Sans Serif'}, 'font_chars': {u'MS Sans Serif': 8}, 'size_chars': {8.0: 8}, ...}
+
+History:
+  2026/10/18: start
+  2026/10/18: Negative \\binN and \\ucN are ignored, \\uN past the last unicode character is U+FFFD
+"""
+
+import argparse
+import codecs
+import re
+import sys
+
+TOKEN = re.compile(br"""
+    \\([a-zA-Z]{1,32})(-?[0-9]{1,10})?[ ]?   # control word, its parameter and the space ending it
+  | \\'([0-9a-fA-F]{2})                      # hex escaped byte
+  | \\([^a-zA-Z'])                           # control symbol
+  | ([{}])
+  | ([^\\{}\r\n\x00]+)                       # text, CR, LF and NUL aren't part of it
+""", re.VERBOSE)
+
+# destinations whose text isn't part of the document's
+SKIP_DESTINATIONS = frozenset([b"colortbl", b"stylesheet", b"info", b"pict", b"object", b"objdata", b"header",
+                               b"headerl", b"headerr", b"headerf", b"footer", b"footerl", b"footerr", b"footerf",
+                               b"footnote", b"fldinst", b"listtable", b"listoverridetable", b"rsidtbl",
+                               b"generator", b"themedata", b"colorschememapping", b"latentstyles", b"datastore",
+                               b"filetbl", b"revtbl", b"xmlnstbl", b"pgdsctbl", b"mmathPr"])
+
+CHARACTERS = {b"par": u"\n", b"line": u"\n", b"sect": u"\n", b"page": u"\n", b"row": u"\n", b"tab": u"\t",
+              b"cell": u"\t", b"emdash": u"\u2014", b"endash": u"\u2013", b"bullet": u"\u2022",
+              b"lquote": u"\u2018", b"rquote": u"\u2019", b"ldblquote": u"\u201c", b"rdblquote": u"\u201d",
+              b"emspace": u"\u2003", b"enspace": u"\u2002", b"qmspace": u"\u2005"}
+
+SYMBOLS = {b"\\": u"\\", b"{": u"{", b"}": u"}", b"~": u"\xa0", b"_": u"\u2011", b"-": u"", b"\r": u"\n",
+           b"\n": u"\n"}
+
+MAX_CHARACTER = min(0x10ffff, sys.maxunicode) # python 2 narrow builds stop at 0xffff
+
+DEFAULT_FONT_SIZE = 24 # \fs is in half points, 12pt when it isn't set
+
+# what the text in a group is
+TEXT, SKIP, FONT_TABLE = 0, 1, 2
+
+
+def text_codec(codepage):
+    try:
+        return codecs.lookup("cp{}".format(codepage)).name
+    except LookupError:
+        return "cp1252"
+
+
+def parse_rtf(data):
+    '''
+    data is the RTF as bytes. RTF saved as UTF-16, a NUL after every character, is decoded first.
+    '''
+    if data[0:2] == b"{\x00":
+        data = data.decode("utf-16-le", "replace").encode("latin-1", "replace")
+
+    codec = "cp1252"
+    pieces = [] # unicode text
+    pending = bytearray() # text bytes not decoded yet
+    fonts = {}
+    font_chars = {}
+    size_chars = {}
+    control_words = {}
+
+    destination, font, size, uc = TEXT, None, DEFAULT_FONT_SIZE, 1
+    stack = []
+    table_font = None # font table entry being read
+    table_name = bytearray()
+    skip_chars = 0 # \uN fallback characters still to drop
+    first_in_group = False # \* only counts straight after {
+
+    pos = 0
+    end = len(data)
+    search = TOKEN.search
+    while pos < end:
+        match = search(data, pos)
+        if match is None:
+            break
+        pos = match.end()
+        word, param, hex_byte, symbol, brace, text = match.groups()
+
+        if word is None and pending and (brace is not None or symbol is not None):
+            # decoded together, a multibyte character can be split over \' escapes and text
+            text_run = pending.decode(codec, "replace")
+            del pending[:]
+            _add_text(text_run, pieces, fonts.get(font, font), size, font_chars, size_chars)
+
+        if text is not None:
+            if skip_chars:
+                dropped = min(skip_chars, len(text))
+                skip_chars -= dropped
+                text = text[dropped:]
+            if destination == TEXT:
+                pending.extend(text)
+            elif destination == FONT_TABLE:
+                table_name.extend(text)
+                if b";" in text: # a ; ends the name, entries don't need a group of their own
+                    _end_font_name(fonts, table_font, table_name, codec)
+                    table_font = None
+            first_in_group = False
+
+        elif hex_byte is not None:
+            if skip_chars:
+                skip_chars -= 1
+            elif destination == TEXT:
+                pending.append(int(hex_byte, 16))
+            elif destination == FONT_TABLE:
+                table_name.append(int(hex_byte, 16))
+            first_in_group = False
+
+        elif brace is not None:
+            if brace == b"{":
+                stack.append((destination, font, size, uc))
+                first_in_group = True
+            else:
+                if destination == FONT_TABLE:
+                    _end_font_name(fonts, table_font, table_name, codec)
+                    table_font = None
+                if stack:
+                    destination, font, size, uc = stack.pop()
+                first_in_group = False
+            skip_chars = 0
+
+        elif symbol is not None:
+            if symbol == b"*":
+                if first_in_group:
+                    destination = SKIP
+            elif destination == TEXT and symbol in SYMBOLS:
+                _add_text(SYMBOLS[symbol], pieces, fonts.get(font, font), size, font_chars, size_chars)
+            first_in_group = False
+
+        else:
+            control_words[word] = control_words.get(word, 0) + 1
+            first_in_group = False
+            if word == b"bin":
+                pos += max(0, int(param or 0)) # a negative length would go back and read the same \bin again
+                continue
+            if destination == SKIP:
+                continue
+            if destination == FONT_TABLE:
+                if word == b"f":
+                    _end_font_name(fonts, table_font, table_name, codec)
+                    table_font = int(param or 0)
+                continue
+            if word == b"fonttbl":
+                destination = FONT_TABLE
+            elif word in SKIP_DESTINATIONS:
+                destination = SKIP
+            elif word == b"ansicpg":
+                codec = text_codec(param)
+                continue
+
+            if pending:
+                text_run = pending.decode(codec, "replace")
+                del pending[:]
+                _add_text(text_run, pieces, fonts.get(font, font), size, font_chars, size_chars)
+            if word == b"u":
+                value = int(param or 0)
+                if value < 0: # signed 16 bit, \u-3913 is U+F0B7
+                    value += 65536
+                _add_text(u"%c" % value if 0 <= value <= MAX_CHARACTER else u"\ufffd", pieces,
+                          fonts.get(font, font), size, font_chars, size_chars)
+                skip_chars = uc
+                continue
+            skip_chars = 0
+            if word == b"f" or (word == b"deff" and font is None):
+                font = int(param or 0)
+            elif word == b"fs":
+                size = int(param or DEFAULT_FONT_SIZE)
+            elif word == b"plain":
+                size = DEFAULT_FONT_SIZE
+            elif word == b"uc":
+                uc = max(0, int(param or 1))
+            elif word in CHARACTERS:
+                _add_text(CHARACTERS[word], pieces, fonts.get(font, font), size, font_chars, size_chars)
+
+    if pending:
+        _add_text(pending.decode(codec, "replace"), pieces, fonts.get(font, font), size, font_chars, size_chars)
+
+    return {"text": u"".join(pieces).strip(u"\r\n"), "fonts": fonts, "font_chars": font_chars,
+            "size_chars": size_chars,
+            "control_words": dict((word.decode("ascii"), count) for word, count in control_words.items())}
+
+
+def _add_text(text, pieces, font_name, size, font_chars, size_chars):
+    pieces.append(text)
+    if text.strip():
+        font_chars[font_name] = font_chars.get(font_name, 0) + len(text)
+        size_chars[size / 2.0] = size_chars.get(size / 2.0, 0) + len(text)
+
+
+def _end_font_name(fonts, table_font, table_name, codec):
+    if table_font is not None and table_name:
+        fonts[table_font] = table_name.split(b";")[0].decode(codec, "replace").strip()
+    del table_name[:]
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("file", type=str, help="RTF file")
+    my_argparser.add_argument("--stats", action='store_true', help="Print the fonts, sizes and control word counts instead of the text", default=False)
+
+    args = my_argparser.parse_args()
+
+    with open(args.file, "rb") as fi:
+        result = parse_rtf(fi.read())
+    if args.stats:
+        del result["text"]
+        print(result)
+    else:
+        print(result["text"].encode("utf-8"))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+
+__description__ = 'SQLite manifest of the documents already scanned, so a rescan only processes new or changed ones'
+__author__ = 'Jon Armer'
+__version__ = '0.0.1'
+__date__ = '2026/10/18'
+
+"""
+
+Source code put in public domain by Jon Armer, no Copyright
+Use at your own risk
+
+The same shares get scanned every night and most documents on them haven't changed. The manifest keeps
+one row per tool and document with its size, mtime, sha256, the tool's __version__, a hash of the
+options that change its output, and the output itself.
+
+A document whose size and mtime match its row, scanned by the same version with the same options,
+is unchanged without being read. Otherwise it is hashed, and if any row has that sha256 (the document was
+touched, copied or moved) its output is reused and the row for the new path is added. Only when both
+miss is the document processed again. Unchanged documents are replayed from the manifest, or left out
+of the output altogether.
+
+Usage:
+$ python extract_img.py -b /mnt/share -j 8 --jsonl results.jsonl --manifest ~/.cache/doctools_manifest.sqlite
+$ python inkedit_parser.py -f ../doc_inkedit/ink_default.doc --manifest ~/.cache/doctools_manifest.sqlite
+
+$ python scan_manifest.py ~/.cache/doctools_manifest.sqlite --stats
+{'extract_img': 18423, 'inkedit_parser': 112}
+$ python scan_manifest.py ~/.cache/doctools_manifest.sqlite --prune
+
+History:
+  2026/10/18: start
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# one statement each, see image_store.SCHEMA
+SCHEMA = ['''
+CREATE TABLE IF NOT EXISTS documents (
+    tool TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL,
+    tool_version TEXT NOT NULL,
+    config TEXT NOT NULL,
+    output TEXT NOT NULL,
+    scanned REAL NOT NULL,
+    PRIMARY KEY (tool, path)
+)''', '''
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents (tool, sha256, tool_version, config)''']
+
+_open_manifests = {}
+
+
+def open_manifest(path):
+    '''
+    Returns one manifest per path for this process, like ocr_cache.open_cache
+    '''
+    key = (os.getpid(), path)
+    if key not in _open_manifests:
+        _open_manifests[key] = scan_manifest(path)
+    return _open_manifests[key]
+
+
+def config_version(options):
+    '''
+    options is a dict of the option values that change a tool's output
+    '''
+    return hashlib.sha1(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fi:
+        for chunk in iter(lambda: fi.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_path(path):
+    '''
+    SQLite on python 2 only takes unicode or ASCII str
+    '''
+    path = os.path.abspath(path)
+    if isinstance(path, bytes):
+        path = path.decode(sys.getfilesystemencoding() or "utf-8", "replace")
+    return path
+
+
+class manifest_entry():
+    '''
+    What check() found for a document. output is None unless it is unchanged, matched says how it was
+    matched: "stat", "sha256", or None when it has to be processed.
+    '''
+
+    def __init__(self, tool, path, tool_version, config):
+        self.tool = tool
+        self.path = path
+        self.tool_version = tool_version
+        self.config = config
+        self.size = None
+        self.mtime = None
+        self.sha256 = None
+        self.output = None
+        self.matched = None
+
+
+class scan_manifest():
+
+    def __init__(self, path):
+        self.path = path
+
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self.db.commit()
+
+    def check(self, tool, path, tool_version, config, always_hash=False):
+        '''
+        Returns a manifest_entry for the document, pass it to record() once it has been processed.
+        With always_hash the size and mtime aren't trusted and the document is always hashed.
+        '''
+        entry = manifest_entry(tool, text_path(path), tool_version, config)
+        st = os.stat(path) # before hashing, a change made after it is seen on the next scan
+        entry.size, entry.mtime = st.st_size, st.st_mtime
+
+        with self.lock:
+            row = self.db.execute("SELECT size, mtime, sha256, tool_version, config, output FROM documents "
+                                  "WHERE tool = ? AND path = ?", (tool, entry.path)).fetchone()
+        if row is not None and not always_hash and \
+                tuple(row[:2]) == (entry.size, entry.mtime) and tuple(row[3:5]) == (tool_version, config):
+            entry.sha256, entry.output, entry.matched = row[2], row[5], "stat"
+            return entry
+
+        entry.sha256 = file_sha256(path)
+        with self.lock:
+            row = self.db.execute("SELECT output FROM documents WHERE tool = ? AND sha256 = ? AND tool_version = ? "
+                                  "AND config = ? LIMIT 1", (tool, entry.sha256, tool_version, config)).fetchone()
+        if row is not None:
+            entry.output, entry.matched = row[0], "sha256"
+            self.record(entry, entry.output) # the next scan finds it by stat again
+        return entry
+
+    def record(self, entry, output):
+        entry.output = output
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (entry.tool, entry.path, entry.size, entry.mtime, entry.sha256, entry.tool_version,
+                             entry.config, output, time.time()))
+
+    def prune(self):
+        '''
+        Removes the rows of documents that are no longer there, returns how many
+        '''
+        with self.lock:
+            paths = [path for path, in self.db.execute("SELECT DISTINCT path FROM documents")]
+            gone = [(path,) for path in paths if not os.path.exists(path)]
+            with self.db:
+                self.db.executemany("DELETE FROM documents WHERE path = ?", gone)
+        return len(gone)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT tool, COUNT(*) FROM documents GROUP BY tool").fetchall())
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    my_argparser = argparse.ArgumentParser()
+    my_argparser.add_argument("manifest", type=str, help="Manifest file given to --manifest")
+    my_argparser.add_argument("--stats", action='store_true', help="Print the number of documents per tool", default=False)
+    my_argparser.add_argument("--prune", action='store_true', help="Remove documents that no longer exist", default=False)
+
+    args = my_argparser.parse_args()
+
+    manifest = scan_manifest(args.manifest)
+    if args.prune:
+        print("removed {} documents".format(manifest.prune()))
+    if args.stats:
+        print(manifest.stats())
+    manifest.close()